@@ -474,11 +474,11 @@ def place_market_order(driver, wait, outcome, yes_no, buy_sell, size):
             print(f"❌ Could not find size input field: {e}")
             raise Exception(f"Could not find size input field: {e}")
         
-        # Click Submit Order button using button[data-testid="stBaseButton-secondary"]
+        # Click Submit Order button using button[data-testid="stBaseButton-secondaryFormSubmit"]
         print("🚀 Clicking Submit Order...")
         try:
             submit_container = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, f'.st-key-submit-order-button-{outcome-1}')))
-            submit_button = submit_container.find_element(By.CSS_SELECTOR, 'button[data-testid="stBaseButton-secondary"]')
+            submit_button = submit_container.find_element(By.CSS_SELECTOR, 'button[data-testid="stBaseButton-secondaryFormSubmit"]')
             driver.execute_script("arguments[0].click();", submit_button)
             print("✅ Clicked Submit Order button")
             time.sleep(2)
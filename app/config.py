@@ -1,5 +1,6 @@
 from typing_extensions import TypedDict
 import os
+import functools
 from dotenv import load_dotenv
 from supabase import create_client, Client
 
@@ -33,7 +34,10 @@ def load_env() -> dict[str, str]:
     
     return env_vars
 
+@functools.lru_cache(maxsize=1)
 def get_supabase_client() -> Client:
+    # One client per process: every query helper calls this, so creating a new
+    # client (and HTTP connection pool) each time would cost a handshake per query
     env = load_env()
     return create_client(env['SUPABASE_URL'], env['SUPABASE_SERVICE_KEY'])
 
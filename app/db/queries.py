@@ -1,4 +1,4 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from typing_extensions import TypedDict
 from supabase import Client
 from app.config import get_supabase_client
@@ -113,6 +113,16 @@ def fetch_user_balance(user_id: str) -> float:
         return float(result.data[0]['balance'])
     return 0.0
 
+def fetch_user_balance_and_order_count(user_id: str) -> Tuple[float, int]:
+    """Fetch a user's balance and how many orders they have ever submitted, in one request"""
+    db = get_db()
+    result = db.table('users').select('balance, orders(count)').eq('user_id', user_id).execute()
+    if result.data:
+        row = result.data[0]
+        order_count = int(row['orders'][0]['count']) if row.get('orders') else 0
+        return float(row['balance']), order_count
+    return 0.0, 0
+
 def update_user_balance(user_id: str, new_balance: float) -> None:
     """Update a user's balance"""
     db = get_db()
@@ -238,15 +248,45 @@ def insert_or_update_pool(pool: Dict[str, Any]) -> None:
     db = get_db()
     db.table('lob_pools').upsert(pool).execute()
 
-def fetch_pools(binary_id: int) -> List[Dict[str, Any]]:
+def fetch_pools(binary_id: Optional[int] = None, include_shares: bool = True) -> List[Dict[str, Any]]:
+    """Fetch LOB pools. If binary_id is None, fetch pools for all outcomes in one query.
+    With include_shares=False the per-user shares JSONB is not transferred (display-only reads).
+    Rows are returned in ascending tick order."""
+    db = get_db()
+    columns = '*' if include_shares else 'outcome_i, yes_no, is_buy, tick, volume'
+    query = db.table('lob_pools').select(columns)
+    if binary_id is not None:
+        query = query.eq('outcome_i', binary_id)
+    return query.order('tick').execute().data
+
+def fetch_user_pool_shares(user_id: str) -> List[Dict[str, Any]]:
+    """Fetch a user's share in each LOB pool they hold a position in.
+    The share is extracted from the shares JSONB server-side, so only pools containing
+    this user are returned, each with a single 'user_share' value instead of the full dict.
+    user_share is selected with -> so it arrives as a JSON number rather than text."""
     db = get_db()
-    return db.table('lob_pools').select('*').eq('outcome_i', binary_id).execute().data
+    return db.table('lob_pools').select(
+        f'outcome_i, yes_no, is_buy, tick, user_share:shares->{user_id}'
+    ).not_.is_(f'shares->>{user_id}', 'null').execute().data
 
 # Trades queries
 def insert_trades_batch(trades: List[Dict[str, Any]]) -> None:
     db = get_db()
     db.table('trades').insert(trades).execute()
 
+def fetch_recent_trades(limit: int = 20) -> List[Dict[str, Any]]:
+    """Fetch the latest trades across all outcomes, newest first, with only the columns the trade feed shows.
+    
+    Buyer and seller display names are embedded in the same request; each users
+    join is disambiguated by its foreign key column. price and size are cast to
+    float8 server-side so they decode as plain floats.
+    """
+    db = get_db()
+    return db.table('trades').select(
+        'outcome_i, yes_no, price::float8, size::float8, buy_user_id, sell_user_id, ts_ms, '
+        'buyer:users!buy_user_id(display_name), seller:users!sell_user_id(display_name)'
+    ).order('ts_ms', desc=True).limit(limit).execute().data
+
 # Ticks queries
 def insert_tick(tick_data: Dict[str, Any]) -> int:
     db = get_db()
@@ -258,6 +298,12 @@ def get_current_tick() -> Dict[str, Any]:
     result = db.table('ticks').select('*').order('tick_id', desc=True).limit(1).execute()
     return result.data[0] if result.data else {}
 
+def fetch_latest_tick_id() -> int:
+    """Return only the latest tick_id (0 if none), without the tick summary payload."""
+    db = get_db()
+    result = db.table('ticks').select('tick_id').order('tick_id', desc=True).limit(1).execute()
+    return result.data[0]['tick_id'] if result.data else 0
+
 # Events queries
 def insert_events(events: List[Dict[str, Any]]) -> None:
     """Insert events into the database, filtering out unsupported fields."""
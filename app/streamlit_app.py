@@ -1,18 +1,25 @@
 import streamlit as st
+import streamlit.components.v1 as components
+import pandas as pd
+import numpy as np
 import time
 import json
+import functools
+import heapq
+from operator import itemgetter
 from uuid import uuid4
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Optional
 from decimal import Decimal
 from datetime import datetime
 
 from app.config import get_supabase_client
 from app.utils import get_current_ms, usdc_amount, price_value, validate_size, validate_price, validate_limit_price_bounds
-from app.db.queries import load_config, insert_user, fetch_user_balance, fetch_positions, fetch_user_orders, get_current_tick, fetch_pools, fetch_engine_state
+from app.db.queries import load_config, insert_user, fetch_user_balance_and_order_count, fetch_positions, fetch_user_orders, fetch_pools, fetch_user_pool_shares, fetch_engine_state, fetch_latest_tick_id, fetch_recent_trades
 from app.services.orders import submit_order, cancel_order, get_user_orders, estimate_slippage
 from app.services.positions import fetch_user_positions
 # Realtime functionality now handled via fragments
-from app.engine.state import get_binary, get_p_yes, get_p_no
+from app.engine.state import get_p_yes, get_p_no
 
 client = get_supabase_client()
 
@@ -40,9 +47,30 @@ SYSTEM_USERS = {
     'Market User'
 }
 
-def filter_system_users(users):
-    """Filter out system users from user list"""
-    return [user for user in users if user.get('display_name', '') not in SYSTEM_USERS]
+# Excluded server-side in users queries, so system rows never reach the app
+SYSTEM_USERS_LIST = sorted(SYSTEM_USERS)
+
+# System user IDs (from app/engine/lob_matching.py and app/engine/orders.py)
+SYSTEM_USER_IDS = frozenset({
+    '00000000-0000-0000-0000-000000000000',  # AMM System
+    '11111111-1111-1111-1111-111111111111',  # Limit YES Pool
+    '22222222-2222-2222-2222-222222222222',  # Limit NO Pool
+    '33333333-3333-3333-3333-333333333333',  # Limit Pool
+    '44444444-4444-4444-4444-444444444444',  # Market User
+})
+
+@functools.lru_cache(maxsize=4)
+def parse_start_ms(start_ts: str) -> int:
+    """Convert the config's ISO start_ts to epoch milliseconds (memoized, it never changes mid-demo)"""
+    start_dt = datetime.fromisoformat(start_ts.replace('Z', '+00:00'))
+    return int(start_dt.timestamp() * 1000)
+
+# Demo config shared by all sessions; widget reruns reuse it instead of re-querying
+# Status checks that must see admin changes immediately still call load_config() directly
+@st.cache_data(ttl=2, show_spinner=False)
+def load_demo_config():
+    """Load the demo config, cached for a couple of seconds across reruns."""
+    return load_config()
 
 if 'user_id' not in st.session_state:
     display_name = st.text_input("Enter display name", key="display-name-input")
@@ -72,7 +100,7 @@ user_id = st.session_state['user_id']
 
 # Enhanced error handling for config loading per audit requirements
 try:
-    config = load_config()
+    config = load_demo_config()
     if not config:
         st.error("❌ Demo configuration not found. Please contact admin.")
         st.stop()
@@ -97,8 +125,6 @@ if 'last_price_update' not in st.session_state:
     st.session_state.last_price_update = 0
 if 'last_leaderboard_update' not in st.session_state:
     st.session_state.last_leaderboard_update = 0
-if 'realtime_user_count' not in st.session_state:
-    st.session_state.realtime_user_count = 0
 
 
 # Get batch interval from config for fragment update timing
@@ -129,61 +155,197 @@ def price_fragment(outcome_i):
         st.warning("Could not load current market prices")
         return None, None
 
-# Fragment for portfolio data - updates at batch interval
-@st.fragment(run_every=batch_interval_s)
-def portfolio_fragment(user_id):
-    """Fragment that fetches portfolio data with hybrid caching strategy.
+# Portfolio data (positions and open orders) per user, refetched once per engine tick
+@st.cache_data(ttl=30, show_spinner=False)
+def load_portfolio(user_id, tick_id):
+    """Fetch the user's positions and open orders as of tick_id.
     
-    Uses manual caching that can be cleared for immediate updates after user actions,
-    while still allowing automatic refresh every batch_interval_s.
+    The two queries are independent, so they run concurrently on a cache miss.
+    Numeric fields are converted to float once here rather than in every view;
+    the portfolio is display-only, Decimal is reserved for order submission.
     """
-    # Check if we have cached data and it's recent
-    cache_key = f'portfolio_cache_{user_id}'
-    current_time = time.time()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        positions_future = executor.submit(fetch_user_positions, user_id)
+        orders_future = executor.submit(get_user_orders, user_id, 'OPEN')
+        positions = positions_future.result()
+        orders = orders_future.result()
     
-    # Return cached data if it's fresh (within batch interval)
-    # Use <= to ensure cache expires exactly at batch_interval_s, preventing timing conflicts
-    if (cache_key in st.session_state and 
-        'timestamp' in st.session_state[cache_key] and 
-        current_time - st.session_state[cache_key]['timestamp'] <= batch_interval_s * 0.9):
-        return st.session_state[cache_key]['data']
+    for p in positions:
+        p['tokens'] = float(p['tokens'])
+    
+    for order in orders:
+        order['size'] = float(order['size'])
+        order['remaining'] = float(order['remaining'])
+        if order['limit_price'] is not None:
+            order['limit_price'] = float(order['limit_price'])
+    
+    return {
+        'positions': positions,
+        'orders': orders
+    }
+
+def get_portfolio(user_id):
+    """Portfolio data for the latest tick, shared by every portfolio view.
     
+    Positions and orders only change when the engine processes a tick or when the
+    user submits, which clears this user's entry. Orders canceled this session are
+    dropped locally instead of refetching. Errors are returned rather than cached
+    so the next rerun retries.
+    """
     try:
-        positions = fetch_user_positions(user_id)
-        orders = get_user_orders(user_id, 'OPEN')
+        portfolio = load_portfolio(user_id, get_latest_tick_id())
+        orders = portfolio['orders']
+        
+        # Hide orders canceled since the cached fetch; forget ids the database no longer returns
+        canceled_orders = st.session_state.get('canceled_orders')
+        if canceled_orders:
+            canceled_orders.intersection_update(order['order_id'] for order in orders)
+            orders = [order for order in orders if order['order_id'] not in canceled_orders]
         
-        result = {
+        return {
             'success': True,
-            'positions': positions,
+            'positions': portfolio['positions'],
             'orders': orders,
             'error': None
         }
-        
-        # Cache the result with timestamp
-        st.session_state[cache_key] = {
-            'data': result,
-            'timestamp': current_time
-        }
-        
-        return result
     except Exception as e:
-        error_result = {
+        return {
             'success': False,
             'positions': [],
             'orders': [],
             'error': str(e)
         }
-        
-        # Don't cache errors, but return them
-        return error_result
+
+# The user's rejected orders - rejections only happen when a tick is processed
+@st.cache_data(ttl=30, show_spinner=False)
+def load_rejected_orders(user_id, tick_id):
+    """Fetch the user's rejected orders as of tick_id."""
+    return fetch_user_orders(user_id, 'REJECTED')
+
+# Latest engine tick - invalidation key for the tick-scoped caches below
+@st.cache_data(ttl=1, show_spinner=False)
+def get_latest_tick_id():
+    """Probe the latest tick_id; a one-column query that is cheap to repeat each second."""
+    return fetch_latest_tick_id()
+
+# Snapshot of market data shared by every outcome tab, rebuilt once per engine tick
+@st.cache_data(ttl=30, show_spinner=False)
+def load_trading_snapshot(tick_id):
+    """Fetch engine state and LOB pools for all outcomes in one pass.
+    
+    Replaces the per-tab fetch_engine_state()/fetch_pools(outcome_i) round trips
+    with a single fetch of each; pools are keyed by outcome for indexed lookups.
+    YES/NO prices are computed once per snapshot so callers only do dict lookups.
+    The two fetches are independent, so they run concurrently on a cache miss.
+    Keyed on tick_id: reruns within the same tick are cache hits.
+    """
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        engine_state_future = executor.submit(fetch_engine_state)
+        pools_future = executor.submit(fetch_pools, include_shares=False)
+        engine_state = engine_state_future.result()
+        pools = pools_future.result()
+    
+    pools_by_outcome: Dict[int, List[Dict[str, Any]]] = {}
+    for pool in pools:
+        pools_by_outcome.setdefault(int(pool['outcome_i']), []).append(pool)
+    prices_by_outcome = {
+        int(binary['outcome_i']): (get_p_yes(binary), get_p_no(binary))
+        for binary in engine_state.get('binaries', [])
+    }
+    return {
+        'engine_state': engine_state,
+        'pools_by_outcome': pools_by_outcome,
+        'prices_by_outcome': prices_by_outcome
+    }
+
+def get_trading_snapshot():
+    """Trading snapshot for the latest engine tick."""
+    return load_trading_snapshot(get_latest_tick_id())
+
+def aggregate_order_book(pools: List[Dict[str, Any]], user_shares: List[Dict[str, Any]], tick_size: float) -> pd.DataFrame:
+    """Aggregate LOB pools into price levels with the user's share at each level.
+    
+    Groups pools by (yes_no, is_buy, tick) in one pandas pass instead of building
+    nested dicts per pool, then joins the user's server-filtered pool shares.
+    Returns float 'price', 'volume' and 'user_share' columns. Levels keep the order
+    of the pools, which fetch_pools returns by ascending tick.
+    Display-only: values stay in floats, Decimal is reserved for order submission.
+    """
+    if not pools:
+        return pd.DataFrame({
+            'yes_no': pd.Series(dtype=object),
+            'is_buy': pd.Series(dtype=bool),
+            'tick': pd.Series(dtype=int),
+            'price': pd.Series(dtype=float),
+            'volume': pd.Series(dtype=float),
+            'user_share': pd.Series(dtype=float)
+        })
+    
+    keys = ['yes_no', 'is_buy', 'tick']
+    df = pd.DataFrame(pools)
+    df['tick'] = df['tick'].astype(int)
+    df['is_buy'] = df['is_buy'].astype(bool)
+    df['volume'] = pd.to_numeric(df['volume']).astype('float64')
+    
+    # Key price levels by integer tick; the display price is derived once per level.
+    # Unsorted groupby keeps the tick order the database returned the pools in
+    book = df.groupby(keys, as_index=False, sort=False)['volume'].sum()
+    
+    if user_shares:
+        shares = pd.DataFrame(user_shares)
+        shares['tick'] = shares['tick'].astype(int)
+        shares['is_buy'] = shares['is_buy'].astype(bool)
+        shares['user_share'] = shares['user_share'].astype(float)
+        book = book.merge(shares.groupby(keys, as_index=False, sort=False)['user_share'].sum(), on=keys, how='left')
+        book['user_share'] = book['user_share'].fillna(0.0)
+    else:
+        book['user_share'] = 0.0
+    
+    book['price'] = book['tick'] * tick_size
+    return book
+
+# The current user's LOB pool shares, filtered server-side, refetched once per engine tick
+@st.cache_data(ttl=30, show_spinner=False)
+def load_user_pool_shares(user_id, tick_id):
+    """Fetch the user's share per LOB pool, keyed by outcome.
+    
+    Only this user's entry of each pool's shares JSONB is returned by the database,
+    so the client never downloads or walks the other users' shares.
+    """
+    shares_by_outcome: Dict[int, List[Dict[str, Any]]] = {}
+    for row in fetch_user_pool_shares(user_id):
+        shares_by_outcome.setdefault(int(row['outcome_i']), []).append(row)
+    return shares_by_outcome
+
+# Aggregated order book per outcome, memoized per engine tick
+@st.cache_data(ttl=30, show_spinner=False)
+def load_order_book(outcome_i, user_id, tick_id, tick_size):
+    """Aggregate one outcome's pools with the user's shares as of tick_id."""
+    pools = load_trading_snapshot(tick_id)['pools_by_outcome'].get(outcome_i, [])
+    
+    # User's LOB shares for the 👤 indicator; the book still renders without them
+    try:
+        user_shares = load_user_pool_shares(user_id, tick_id).get(outcome_i, [])
+    except Exception:
+        user_shares = []
+    
+    # Aggregate pools by price level in a single vectorized pass
+    return aggregate_order_book(pools, user_shares, tick_size)
+
+# Order-ticket slippage estimate, re-simulated only when the inputs or the engine tick change
+@st.cache_data(ttl=30, max_entries=128, show_spinner=False)
+def load_slippage_estimate(outcome_i, yes_no, size, is_buy, max_slippage, tick_id):
+    """Simulate the order against the engine state as of tick_id."""
+    return estimate_slippage(outcome_i, yes_no, size, is_buy, max_slippage)
 
 # Helper function for getting current prices (used by price fragment)
-def get_current_prices(outcome_i, mr_enabled=None):
-    """Get current YES and NO prices for an outcome"""
+def get_current_prices(outcome_i, mr_enabled=None, prices_by_outcome=None):
+    """Get current YES and NO prices for an outcome.
+    
+    Callers valuing many positions can pass a snapshot's prices_by_outcome
+    to skip the per-call snapshot lookup.
+    """
     try:
-        engine_state = fetch_engine_state()
-        binary = get_binary(engine_state, outcome_i)
-        
         # Use passed mr_enabled parameter or default to False for safety
         # This avoids circular config loading and improves performance
         if mr_enabled is None:
@@ -192,15 +354,27 @@ def get_current_prices(outcome_i, mr_enabled=None):
         # Always use proper TDD price calculation including virtual_yes component
         # The TDD specifies p_yes = (q_yes + virtual_yes) / L regardless of mr_enabled
         # mr_enabled only affects whether multi-resolution logic is active, not price calculation
-        current_p_yes = get_p_yes(binary)
-        
-        current_p_no = get_p_no(binary)  # NO prices don't use virtual_yes
+        # Prices are precomputed per outcome in the cached trading snapshot
+        if prices_by_outcome is None:
+            prices_by_outcome = get_trading_snapshot()['prices_by_outcome']
+        current_p_yes, current_p_no = prices_by_outcome[int(outcome_i)]
         return current_p_yes, current_p_no
         
     except Exception as e:
         # Fallback to $0.50 prices if calculation fails
         return 0.5, 0.5
 
+def get_prices_by_outcome():
+    """Per-outcome (p_yes, p_no) for the latest tick, for views that price many rows.
+    
+    Returns an empty dict if the snapshot is unavailable, so get_current_prices
+    falls back to $0.50 per lookup as before.
+    """
+    try:
+        return get_trading_snapshot()['prices_by_outcome']
+    except Exception:
+        return {}
+
 # Fragment for waiting room status checking - only runs when status is DRAFT
 @st.fragment(run_every=3)  # Check every 3 seconds
 def waiting_room_status_fragment():
@@ -219,10 +393,12 @@ def waiting_room_status_fragment():
         if current_status == 'RUNNING' or current_status == 'FROZEN':
             st.success("🚀 Demo is starting! Redirecting to trading interface...")
             time.sleep(1)  # Brief pause for user to see the message
+            load_demo_config.clear()  # The full rerun must see the new status
             st.rerun()
         elif current_status == 'RESOLVED':
             st.success("🏁 Demo has completed! Redirecting to results...")
             time.sleep(1)  # Brief pause for user to see the message
+            load_demo_config.clear()
             st.rerun()
         
         return {
@@ -240,52 +416,49 @@ def waiting_room_status_fragment():
             'last_check': st.session_state.get('last_status_check', time.time())
         }
 
-# Enhanced waiting room with fragment-based status updates
-if status == 'DRAFT':
-    st.title("🎮 Gaming Market Demo")
-    st.header("⏳ Waiting Room")
-    
-    # Get status check data from fragment
-    status_data = waiting_room_status_fragment()
-    
-    # Show joined users count with realtime updates
+# Waiting-room player names - shared by all sessions, refreshed at the status-check cadence
+@st.cache_data(ttl=3, show_spinner=False)
+def load_player_names():
+    """Fetch the display names of joined players (one narrow column)."""
+    return [user['display_name'] for user in client.table('users').select('display_name').execute().data]
+
+# Fragment for the waiting-room players - refreshes on its own from the shared cache
+@st.fragment(run_every=3)
+def player_list_fragment():
+    """Show the joined player count and names; new joins appear without a page rerun."""
     try:
-        # Check if we have realtime user count
-        if st.session_state['realtime_user_count'] > 0:
-            user_count = st.session_state['realtime_user_count']
-            users = client.table('users').select('*').execute().data  # Still need this for player list
-        else:
-            # Fallback to static fetch and store in realtime cache
-            users = client.table('users').select('*').execute().data
-            user_count = len(users)
-            st.session_state['realtime_user_count'] = user_count
-        
-        # Display user count
-        st.markdown(f'👥 **{user_count} players joined** - Waiting for admin to start the demo...')
-        
+        player_names = load_player_names()
     except Exception as e:
         st.error(f"⚠️ Connection issue: {str(e)}")
-        user_count = 0
-        users = []
+        return
     
-    # Manual refresh button
-    col1, col2, col3 = st.columns([1, 1, 1])
-    with col2:
-        if st.button("🔄 Check Status", type="primary"):
-            # Reset status check count and force immediate rerun
-            if 'status_check_count' in st.session_state:
-                st.session_state.status_check_count = 0
-            st.rerun()
+    # Display user count
+    st.markdown(f'👥 **{len(player_names)} players joined** - Waiting for admin to start the demo...')
     
     # Show current players
-    if users:
+    if player_names:
         st.subheader("👥 Joined Players")
-        player_names = [user['display_name'] for user in users]
         # Display players in a nice grid
         cols = st.columns(min(3, len(player_names)))
         for i, name in enumerate(player_names):
             with cols[i % len(cols)]:
                 st.write(f"• {name}")
+
+# Enhanced waiting room with fragment-based status updates
+if status == 'DRAFT':
+    st.title("🎮 Gaming Market Demo")
+    st.header("⏳ Waiting Room")
+    
+    # Get status check data from fragment
+    status_data = waiting_room_status_fragment()
+    
+    # Joined players count and list, kept live by their own fragment
+    player_list_fragment()
+    
+    # Manual refresh button - the click itself reruns the page, the callback just resets the counter
+    col1, col2, col3 = st.columns([1, 1, 1])
+    with col2:
+        st.button("🔄 Check Status", type="primary", on_click=lambda: st.session_state.update(status_check_count=0))
     
     # Status notification area
     with st.container():
@@ -308,27 +481,53 @@ if status == 'DRAFT':
     
     st.stop()
 
-if status == 'FROZEN':
-    st.warning("⏸️ **Trading is currently frozen**")
-    st.info("The admin has temporarily paused trading. Please wait for trading to resume.")
-    
-    # Auto-refresh for frozen status too
+# Fragment for frozen status checking - only runs when status is FROZEN
+@st.fragment(run_every=1)  # Wakes every second; the DB is only queried when a check is due
+def frozen_status_fragment():
+    """Fragment to poll the demo status while trading is frozen and reload the page once it changes"""
+    # Monotonic clock, immune to wall-clock jumps
     if 'last_frozen_check' not in st.session_state:
-        st.session_state.last_frozen_check = time.time()
+        st.session_state.last_frozen_check = time.monotonic()
+    if 'frozen_miss_streak' not in st.session_state:
+        st.session_state.frozen_miss_streak = 0
     
-    current_time = time.time()
-    if current_time - st.session_state.last_frozen_check > 2:
+    # Back off from 2s to 5s between checks once 5 checks in a row saw no change
+    check_interval = 5 if st.session_state.frozen_miss_streak >= 5 else 2
+    current_time = time.monotonic()
+    if current_time - st.session_state.last_frozen_check > check_interval:
         st.session_state.last_frozen_check = current_time
         fresh_config = load_config()
         if fresh_config['status'] != 'FROZEN':
+            st.session_state.frozen_miss_streak = 0
             st.success("✅ Trading has resumed!")
             time.sleep(1)
+            load_demo_config.clear()  # The full rerun must see the new status
             st.rerun()
+        else:
+            st.session_state.frozen_miss_streak += 1
+
+if status == 'FROZEN':
+    st.warning("⏸️ **Trading is currently frozen**")
+    st.info("The admin has temporarily paused trading. Please wait for trading to resume.")
+    
+    # Auto-refresh for frozen status too - the fragment polls on its own, no page rerun needed
+    frozen_status_fragment()
+    
+    # Expire the debounce so the click's own rerun re-reads the status immediately
+    def force_frozen_check():
+        st.session_state.last_frozen_check = float('-inf')
+        st.session_state.frozen_miss_streak = 0
     
-    if st.button("🔄 Check Status"):
-        st.rerun()
+    st.button("🔄 Check Status", on_click=force_frozen_check)
     st.stop()
 
+# Performance graph of a resolved demo - its history is final, so build the figure once per demo
+@st.cache_resource(show_spinner=False)
+def load_resolved_graph(start_ts):
+    """Build the resolved demo's metrics figure; keyed on start_ts so a new demo gets a new graph."""
+    from app.scripts.generate_graph import generate_graph
+    return generate_graph()
+
 if status == 'RESOLVED':
     st.title("🏆 Demo Resolved - Final Results")
     
@@ -347,9 +546,10 @@ if status == 'RESOLVED':
     with results_tab1:
         st.header("🏆 Final Rankings")
         
-        # Get all users and filter system users
-        users = client.table('users').select('*').execute().data
-        users = filter_system_users(users)
+        # Get all non-system users (ranking columns only)
+        users = client.table('users').select('user_id, display_name, balance, net_pnl, trade_count').not_.in_(
+            'display_name', SYSTEM_USERS_LIST
+        ).execute().data
         
         if users:
             # Sort by multiple criteria
@@ -473,7 +673,7 @@ if status == 'RESOLVED':
         
         # Show final prices and market state
         try:
-            engine_state = fetch_engine_state()
+            engine_state = get_trading_snapshot()['engine_state']
             if engine_state and 'binaries' in engine_state:
                 st.subheader("Final Outcome Prices")
                 
@@ -525,8 +725,7 @@ if status == 'RESOLVED':
         st.header("📈 Market Performance Over Time")
         
         try:
-            from app.scripts.generate_graph import generate_graph
-            fig = generate_graph()
+            fig = load_resolved_graph(config.get('start_ts'))
             st.pyplot(fig)
         except Exception as e:
             st.error(f"Error generating performance graph: {e}")
@@ -546,10 +745,7 @@ if status == 'RESOLVED':
             demo_duration = "N/A"
             if 'start_ts' in config and config['start_ts']:
                 try:
-                    from datetime import datetime
-                    start_dt = datetime.fromisoformat(config['start_ts'].replace('Z', '+00:00'))
-                    end_dt = datetime.now(start_dt.tzinfo)
-                    duration_seconds = (end_dt - start_dt).total_seconds()
+                    duration_seconds = (get_current_ms() - parse_start_ms(config['start_ts'])) / 1000
                     demo_duration = f"{duration_seconds/60:.1f} minutes"
                 except:
                     pass
@@ -584,10 +780,8 @@ elif 'start_ts_ms' in config and config['start_ts_ms']:
 # Fallback to start_ts if present
 elif 'start_ts' in config and config['start_ts']:
     try:
-        # Simple ISO timestamp parsing
-        timestamp_str = config['start_ts'].replace('Z', '+00:00')
-        start_dt = datetime.fromisoformat(timestamp_str)
-        start_ms = int(start_dt.timestamp() * 1000)
+        # Simple ISO timestamp parsing (memoized across reruns)
+        start_ms = parse_start_ms(config['start_ts'])
     except Exception as e:
         print(f"Error parsing start_ts: {e}")
         start_ms = None
@@ -603,40 +797,46 @@ else:
     if total_duration_ms > 0:
         time_to_end = max(0, (total_duration_ms - elapsed_ms) / 1000)
         
-        # Create a placeholder for the countdown timer
-        countdown_placeholder = st.empty()
-        
-        # Format time nicely
-        def format_time(seconds):
-            mins, secs = divmod(int(seconds), 60)
-            hours, mins = divmod(mins, 60)
-            if hours > 0:
-                return f"{hours:02d}:{mins:02d}:{secs:02d}"
-            else:
-                return f"{mins:02d}:{secs:02d}"
-        
-        # Fragment-based countdown timer - updates every second
-        @st.fragment(run_every=1.0)  # Update every 1 second
-        def countdown_fragment():
-            # Recalculate current time for accurate countdown
-            current_ms_live = get_current_ms()
-            elapsed_ms_live = current_ms_live - start_ms
-            time_to_end_live = max(0, (total_duration_ms - elapsed_ms_live) / 1000)
-            progress_live = min(1.0, elapsed_ms_live / total_duration_ms) if total_duration_ms > 0 else 0
-            
-            # Display countdown with live updates
-            col1, col2 = st.columns([3, 1])
-            with col1:
-                st.metric("Time Remaining", format_time(time_to_end_live))
-                if total_duration_ms > 0:
-                    st.progress(progress_live, text=f"Progress: {int(progress_live * 100)}%")
-            with col2:
-                st.metric("Elapsed", format_time(elapsed_ms_live / 1000))
-            
-            return time_to_end_live, progress_live
-        
-        # Call the countdown fragment for live updates
-        time_remaining, current_progress = countdown_fragment()
+        # Countdown ticks in the browser - the server only renders the start/end once per run
+        # instead of rerunning a fragment every second for every connected user.
+        # The server clock is passed along so the countdown ignores client clock skew.
+        components.html(f"""
+<div style="font-family: 'Source Sans Pro', sans-serif; color: #31333F;">
+  <div style="display: flex; gap: 2rem;">
+    <div style="flex: 3;">
+      <div style="font-size: 14px;">Time Remaining</div>
+      <div id="remaining" style="font-size: 2.25rem;"></div>
+    </div>
+    <div style="flex: 1;">
+      <div style="font-size: 14px;">Elapsed</div>
+      <div id="elapsed" style="font-size: 2.25rem;"></div>
+    </div>
+  </div>
+  <div style="font-size: 14px;" id="progress-text"></div>
+  <div style="background: #F0F2F6; border-radius: 4px; height: 6px;">
+    <div id="progress-bar" style="background: #FF4B4B; border-radius: 4px; height: 6px; width: 0;"></div>
+  </div>
+</div>
+<script>
+  const startMs = {start_ms}, totalMs = {total_duration_ms}, clockOffset = {current_ms} - Date.now();
+  const fmt = (seconds) => {{
+    seconds = Math.floor(seconds);
+    const pad = (n) => String(n).padStart(2, '0');
+    const h = Math.floor(seconds / 3600), m = Math.floor(seconds / 60) % 60, s = seconds % 60;
+    return h > 0 ? `${{pad(h)}}:${{pad(m)}}:${{pad(s)}}` : `${{pad(m)}}:${{pad(s)}}`;
+  }};
+  const tick = () => {{
+    const elapsedMs = Date.now() + clockOffset - startMs;
+    const progress = Math.max(0, Math.min(1, elapsedMs / totalMs));
+    document.getElementById('remaining').innerText = fmt(Math.max(0, (totalMs - elapsedMs) / 1000));
+    document.getElementById('elapsed').innerText = fmt(Math.max(0, elapsedMs / 1000));
+    document.getElementById('progress-text').innerText = `Progress: ${{Math.floor(progress * 100)}}%`;
+    document.getElementById('progress-bar').style.width = `${{progress * 100}}%`;
+  }};
+  tick();
+  setInterval(tick, 1000);
+</script>
+""", height=120)
     else:
         st.metric("Time to End", "Duration not configured")
 
@@ -659,12 +859,14 @@ def balance_fragment():
         return cached_balance
     
     try:
-        balance = fetch_user_balance(user_id)
+        # Balance and order count share one users request; the metrics fragment reuses the count
+        balance, order_count = fetch_user_balance_and_order_count(user_id)
         balance_float = float(balance)
         
         # Cache the result
         st.session_state[cache_key] = {
             'data': balance_float,
+            'order_count': order_count,
             'timestamp': current_time
         }
         
@@ -676,116 +878,119 @@ def balance_fragment():
 
 balance = balance_fragment()
 
+# Leaderboard data - shared by all sessions, recomputed once per engine tick or after an order mutation
+@st.cache_data(ttl=30, show_spinner=False)
+def load_leaderboard(tick_id):
+    """Compute portfolio metrics for every player and the top-5 boards."""
+    # System users are filtered out by the database
+    users = client.table('users').select('user_id, display_name, balance, net_pnl, trade_count').not_.in_(
+        'display_name', SYSTEM_USERS_LIST
+    ).execute().data
+    
+    # Prices for this tick, resolved once for every position valued below
+    prices_by_outcome = load_trading_snapshot(tick_id)['prices_by_outcome']
+    
+    # Current market value of held tokens per user: one query, valued and summed in one vectorized pass
+    holdings_value: Dict[str, float] = {}
+    try:
+        positions = client.table('positions').select('user_id, outcome_i, yes_no, tokens').in_(
+            'user_id', [user['user_id'] for user in users]
+        ).gt('tokens', 0).execute().data if users else []
+        if positions:
+            df = pd.DataFrame(positions)
+            outcome_idx = df['outcome_i'].astype(int)
+            # Fallback to $0.50 for outcomes without a price
+            p_yes = outcome_idx.map({i: prices[0] for i, prices in prices_by_outcome.items()}).fillna(0.5)
+            p_no = outcome_idx.map({i: prices[1] for i, prices in prices_by_outcome.items()}).fillna(0.5)
+            df['value'] = pd.to_numeric(df['tokens']).astype(float) * np.where(df['yes_no'] == 'YES', p_yes, p_no)
+            holdings_value = df.groupby('user_id')['value'].sum().to_dict()
+    except Exception:
+        # If we can't get positions, just use balance + net_pnl
+        holdings_value = {}
+    
+    # Calculate comprehensive metrics for each user
+    users_with_metrics = []
+    for user in users:
+        total_value = float(user['balance']) + float(user['net_pnl']) + holdings_value.get(user['user_id'], 0.0)
+        
+        # Calculate % gain/loss (assuming $100 starting balance per Implementation Plan)
+        starting_balance = 100.0
+        pct_gain_loss = ((total_value - starting_balance) / starting_balance) * 100
+        
+        # Get trade count
+        trade_count = int(user.get('trade_count', 0))
+        
+        user_copy = user.copy()
+        user_copy['total_portfolio_value'] = total_value
+        user_copy['pct_gain_loss'] = pct_gain_loss
+        user_copy['trade_count'] = trade_count
+        users_with_metrics.append(user_copy)
+    
+    # Create multiple leaderboards per Implementation Plan requirements
+    # Only the top 5 are shown, so select them without fully sorting every user
+    leaderboard_by_value = heapq.nlargest(5, users_with_metrics, key=itemgetter('total_portfolio_value'))
+    leaderboard_by_pct = heapq.nlargest(5, users_with_metrics, key=itemgetter('pct_gain_loss'))
+    leaderboard_by_trades = heapq.nlargest(5, users_with_metrics, key=itemgetter('trade_count'))
+    
+    return {
+        'leaderboard_by_value': leaderboard_by_value,
+        'leaderboard_by_pct': leaderboard_by_pct,
+        'leaderboard_by_trades': leaderboard_by_trades,
+        'user_count': len(users)
+    }
+
 # Fragment for leaderboard - updates at 2x batch interval (less frequent)
 @st.fragment(run_every=batch_interval_s * 2)
 def leaderboard_fragment():
+    """Fetch and render the sidebar leaderboard without rerunning the full page"""
     try:
-        users = client.table('users').select('*').execute().data
-        
-        # Filter out system users
-        users = filter_system_users(users)
-        
-        # Calculate comprehensive metrics for each user
-        users_with_metrics = []
-        for user in users:
-            total_value = float(user['balance']) + float(user['net_pnl'])
-            
-            # Add current market value of held tokens
-            try:
-                positions = client.table('positions').select('*').eq('user_id', user['user_id']).execute().data
-                for p in positions:
-                    if float(p['tokens']) > 0:
-                        outcome_i = int(p['outcome_i'])
-                        # Use conservative default for mr_enabled to avoid config loading in fragments
-                        current_p_yes, current_p_no = get_current_prices(outcome_i, False)
-                        if current_p_yes is not None and current_p_no is not None:
-                            if p['yes_no'] == 'YES':
-                                total_value += float(p['tokens']) * current_p_yes
-                            else:
-                                total_value += float(p['tokens']) * current_p_no
-                        else:
-                            # Fallback to $0.50 if prices unavailable
-                            total_value += float(p['tokens']) * 0.5
-            except Exception:
-                # If we can't get positions, just use balance + net_pnl
-                pass
-            
-            # Calculate % gain/loss (assuming $100 starting balance per Implementation Plan)
-            starting_balance = 100.0
-            pct_gain_loss = ((total_value - starting_balance) / starting_balance) * 100
-            
-            # Get trade count
-            trade_count = int(user.get('trade_count', 0))
-            
-            user_copy = user.copy()
-            user_copy['total_portfolio_value'] = total_value
-            user_copy['pct_gain_loss'] = pct_gain_loss
-            user_copy['trade_count'] = trade_count
-            users_with_metrics.append(user_copy)
-        
-        # Create multiple leaderboards per Implementation Plan requirements
-        leaderboard_by_value = sorted(users_with_metrics, key=lambda u: u['total_portfolio_value'], reverse=True)[:5]
-        leaderboard_by_pct = sorted(users_with_metrics, key=lambda u: u['pct_gain_loss'], reverse=True)[:5]
-        leaderboard_by_trades = sorted(users_with_metrics, key=lambda u: u['trade_count'], reverse=True)[:5]
-        
-        # Return data instead of writing to sidebar directly
-        return {
-            'success': True,
-            'leaderboard_by_value': leaderboard_by_value,
-            'leaderboard_by_pct': leaderboard_by_pct,
-            'leaderboard_by_trades': leaderboard_by_trades,
-            'user_count': len(users),
-            'error': None
-        }
+        leaderboard_data = load_leaderboard(get_latest_tick_id())
     except Exception as e:
-        return {
-            'success': False,
-            'leaderboard_by_value': [],
-            'leaderboard_by_pct': [],
-            'leaderboard_by_trades': [],
-            'user_count': 0,
-            'error': str(e)
-        }
+        st.warning(f"Could not load leaderboard: {str(e)}")
+        return
+    
+    # Create tabs for different ranking types per Implementation Plan
+    lb_tab1, lb_tab2, lb_tab3 = st.tabs(["💰 Value", "📈 % Gain", "🔄 Trades"])
+    
+    with lb_tab1:
+        st.subheader("By Portfolio Value")
+        for rank, user in enumerate(leaderboard_data['leaderboard_by_value'], 1):
+            total_value = user.get('total_portfolio_value', float(user['balance']) + float(user['net_pnl']))
+            st.write(f"{rank}. {user['display_name']}: ${total_value:.2f}")
+    
+    with lb_tab2:
+        st.subheader("By % Gain/Loss")
+        for rank, user in enumerate(leaderboard_data['leaderboard_by_pct'], 1):
+            pct_gain = user.get('pct_gain_loss', 0)
+            st.write(f"{rank}. {user['display_name']}: {pct_gain:+.1f}%")
+    
+    with lb_tab3:
+        st.subheader("By Trade Count")
+        for rank, user in enumerate(leaderboard_data['leaderboard_by_trades'], 1):
+            trade_count = user.get('trade_count', 0)
+            st.write(f"{rank}. {user['display_name']}: {trade_count} trades")
+    
+    # Display user count
+    st.markdown(f'👥 **{leaderboard_data["user_count"]} players online**')
 
 # Call fragment within sidebar context
 with st.sidebar:
     st.header("Leaderboard")
-    
-    leaderboard_data = leaderboard_fragment()
-    
-    if leaderboard_data['success']:
-        # Create tabs for different ranking types per Implementation Plan
-        lb_tab1, lb_tab2, lb_tab3 = st.tabs(["💰 Value", "📈 % Gain", "🔄 Trades"])
-        
-        with lb_tab1:
-            st.subheader("By Portfolio Value")
-            for rank, user in enumerate(leaderboard_data['leaderboard_by_value'], 1):
-                total_value = user.get('total_portfolio_value', float(user['balance']) + float(user['net_pnl']))
-                st.write(f"{rank}. {user['display_name']}: ${total_value:.2f}")
-        
-        with lb_tab2:
-            st.subheader("By % Gain/Loss")
-            for rank, user in enumerate(leaderboard_data['leaderboard_by_pct'], 1):
-                pct_gain = user.get('pct_gain_loss', 0)
-                st.write(f"{rank}. {user['display_name']}: {pct_gain:+.1f}%")
-        
-        with lb_tab3:
-            st.subheader("By Trade Count")
-            for rank, user in enumerate(leaderboard_data['leaderboard_by_trades'], 1):
-                trade_count = user.get('trade_count', 0)
-                st.write(f"{rank}. {user['display_name']}: {trade_count} trades")
-        
-        # Display user count
-        st.markdown(f'👥 **{leaderboard_data["user_count"]} players online**')
-        user_count = leaderboard_data['user_count']
-    else:
-        st.warning(f"Could not load leaderboard: {leaderboard_data['error']}")
-        user_count = 0
+    leaderboard_fragment()
+
+# Trading parameters used throughout the outcome tabs - converted once per run
+TICK_SIZE = float(params.get('tick_size', 0.01))
+GAS_FEE = float(params.get('gas_fee', 0.0))
+F_MATCH = float(params.get('f_match', 0.02))
+P_MIN = Decimal(str(params['p_min']))
+P_MAX = Decimal(str(params['p_max']))
+AF_ENABLED = bool(params['af_enabled'])
+OUTCOME_NAMES = params.get('outcome_names', [])
 
 # Create outcome tabs based on configured outcomes and active status (multi-resolution support)
 try:
     # Get engine state to check for active outcomes in multi-resolution scenarios
-    engine_state = fetch_engine_state()
+    engine_state = get_trading_snapshot()['engine_state']
     active_outcomes = []
     
     for i in range(params['n_outcomes']):
@@ -808,13 +1013,76 @@ except Exception as e:
     st.warning(f"Could not check outcome status: {e}")
     active_outcomes = list(range(params['n_outcomes']))
 
+# One side (asks or bids) of a token's order book, shared by the YES and NO book tabs
+# Price and volume stay numeric; the browser formats them instead of a Python string pass
+BOOK_COLUMN_CONFIG = {
+    'price': st.column_config.NumberColumn('Price', format='$%.4f'),
+    'volume': st.column_config.NumberColumn('Volume', format='%.2f'),
+}
+
+def render_book_side(side_book, label, empty_text):
+    """Show one side of a token's order book, or a placeholder when it has no levels"""
+    if not side_book.empty:
+        st.write(label)
+        st.dataframe(
+            side_book[['price', 'volume', 'Your Share', 'User']],
+            column_config=BOOK_COLUMN_CONFIG,
+            use_container_width=True,
+            hide_index=True
+        )
+    else:
+        st.write(empty_text)
+
+# Fragment for the per-outcome order book - reruns on its own at batch interval
+@st.fragment(run_every=batch_interval_s)
+def order_book_fragment(outcome_i):
+    """Render the live order book for one outcome without rerunning the full page"""
+    # Use module-scope price fragment for live updates
+    current_p_yes, current_p_no = price_fragment(outcome_i)
+    
+    # Enhanced order book aggregation with user position tracking, rebuilt only on a new tick
+    order_book = load_order_book(outcome_i, user_id, get_latest_tick_id(), TICK_SIZE)
+    
+    # Preformat the share columns once for all four book tables
+    holds_share = order_book['user_share'] > 0
+    order_book['Your Share'] = order_book['user_share'].map('{:.2f}'.format).where(holds_share, '-')
+    order_book['User'] = np.where(holds_share, '👤', '')
+    
+    # Display enhanced order book - the same layout for each token
+    tab1, tab2 = st.tabs(["📈 YES Token", "📉 NO Token"])
+    
+    for tab, token, current_price in ((tab1, 'YES', current_p_yes), (tab2, 'NO', current_p_no)):
+        with tab:
+            st.subheader(f"{token} Token Order Book")
+            token_book = order_book[order_book['yes_no'] == token]
+            
+            # Asks (low to high - levels already arrive in ascending tick order)
+            render_book_side(token_book[~token_book['is_buy']], "**🔴 Asks (Sellers)**", "*No asks available*")
+            
+            # Current market price indicator
+            if current_price:
+                st.write(f"**📊 Current Market Price: ${current_price:.4f}**")
+            
+            # Bids (high to low - the ascending levels reversed)
+            render_book_side(token_book[token_book['is_buy']].iloc[::-1], "**🟢 Bids (Buyers)**", "*No bids available*")
+    
+    # Summary of user's LOB positions
+    total_user_positions = int(holds_share.sum())
+    
+    if total_user_positions > 0:
+        st.info(f"👤 **You have positions in {total_user_positions} LOB pools** - Look for the 👤 indicator above")
+
 # Create tabs only for active outcomes
+# Tabs track the selection and rerun on switch, so only the open tab's body runs
 outcome_tabs = st.tabs([
-    params['outcome_names'][i] if i < len(params['outcome_names']) else f"Outcome {i+1}" 
+    OUTCOME_NAMES[i] if i < len(OUTCOME_NAMES) else f"Outcome {i+1}" 
     for i in active_outcomes
-])
+], key="outcome-tabs", on_change="rerun")
 
 for tab_index, tab in enumerate(outcome_tabs):
+    # Skip hidden tabs - no price/order book fragments or slippage estimate for them
+    if not tab.open:
+        continue
     # Use actual outcome index from active_outcomes, not tab index
     outcome_i = active_outcomes[tab_index]
     with tab:
@@ -825,25 +1093,35 @@ for tab_index, tab in enumerate(outcome_tabs):
             direction = st.radio("Direction", ['Buy', 'Sell'], key=f"buy-sell-radio-{outcome_i}")
             is_buy = direction == 'Buy'
             order_type = st.selectbox("Type", ['MARKET', 'LIMIT'], key=f"order-type-select-{outcome_i}")
-            size_input = st.number_input("Size", min_value=0.01, value=1.0, key=f"size-input-{outcome_i}")
+            
+            # Numeric inputs live in a form so editing them doesn't rerun the page;
+            # the estimate below refreshes on Preview and orders go out on Submit
+            with st.form(f"order-ticket-form-{outcome_i}", clear_on_submit=False, border=False):
+                size_input = st.number_input("Size", min_value=0.01, value=1.0, key=f"size-input-{outcome_i}")
+                limit_price_input: Optional[float] = None
+                max_slippage_input: Optional[float] = None
+                if order_type == 'LIMIT':
+                    limit_price_input = st.number_input("Limit Price", min_value=0.0, max_value=1.0, step=0.01, value=0.5, key=f"limit_price_{outcome_i}")
+                else:
+                    max_slippage_input = st.number_input("Max Slippage %", min_value=0.0, value=25.0, key=f"max_slippage_{outcome_i}") / 100
+                af_opt_in = st.checkbox("Auto-Fill Opt-In", value=True, key=f"af_opt_in_{outcome_i}") if AF_ENABLED else False
+                
+                preview_col, submit_col = st.columns(2)
+                with preview_col:
+                    st.form_submit_button("Preview Order", key=f"preview-order-button-{outcome_i}")
+                with submit_col:
+                    submit_clicked = st.form_submit_button("Submit Order", key=f"submit-order-button-{outcome_i}")
             size = usdc_amount(size_input)
-            limit_price_input: Optional[float] = None
-            max_slippage_input: Optional[float] = None
-            if order_type == 'LIMIT':
-                limit_price_input = st.number_input("Limit Price", min_value=0.0, max_value=1.0, step=0.01, value=0.5, key=f"limit_price_{outcome_i}")
-            else:
-                max_slippage_input = st.number_input("Max Slippage %", min_value=0.0, value=25.0, key=f"max_slippage_{outcome_i}") / 100
-            af_opt_in = st.checkbox("Auto-Fill Opt-In", value=True, key=f"af_opt_in_{outcome_i}") if params['af_enabled'] else False
 
             try:
                 validate_size(size)
                 if limit_price_input is not None:
                     limit_price = price_value(limit_price_input)
                     validate_price(limit_price)
-                    validate_limit_price_bounds(limit_price, Decimal(str(params['p_min'])), Decimal(str(params['p_max'])))
+                    validate_limit_price_bounds(limit_price, P_MIN, P_MAX)
                 if max_slippage_input is not None:
                     validate_price(price_value(max_slippage_input))
-                est = estimate_slippage(outcome_i, yes_no, size, is_buy, price_value(max_slippage_input) if max_slippage_input else None)
+                est = load_slippage_estimate(outcome_i, yes_no, size, is_buy, price_value(max_slippage_input) if max_slippage_input else None, get_latest_tick_id())
                 
                 # Enhanced transaction confirmation with comprehensive details
                 with st.expander("📋 Transaction Confirmation", expanded=True):
@@ -865,14 +1143,13 @@ for tab_index, tab in enumerate(outcome_tabs):
                     # Fee Breakdown
                     st.subheader("💰 Fee Breakdown")
                     est_cost = est['est_cost']
-                    gas_fee = Decimal(params['gas_fee'])
                     
                     # Calculate trading fee estimate and effective price
                     if order_type == 'LIMIT' and limit_price_input is not None:
                         # For limit orders: use proper fee structure based on match type
                         execution_cost = float(size) * limit_price_input
                         # Use f_match for cross-matches, f for same-side matches (simplified to f_match for estimation)
-                        trading_fee_est = params.get('f_match', 0.02) * float(size) * limit_price_input
+                        trading_fee_est = F_MATCH * float(size) * limit_price_input
                         effective_price = limit_price_input  # True limit price enforcement
                     else:
                         # For market orders: est_cost already includes fees from service
@@ -885,16 +1162,16 @@ for tab_index, tab in enumerate(outcome_tabs):
                         st.write(f"**Execution Cost:** ${execution_cost:.2f}")
                         st.write(f"**Trading Fee (est.):** ${trading_fee_est:.4f}")
                         # Prominent gas fee display per Implementation Plan
-                        st.markdown(f"**🔥 Gas Fee:** ${float(gas_fee):.4f}")
+                        st.markdown(f"**🔥 Gas Fee:** ${GAS_FEE:.4f}")
                         st.caption("⚠️ Deducted on submission regardless of success")
                     with fee_col2:
-                        total_fees = trading_fee_est + float(gas_fee)
+                        total_fees = trading_fee_est + GAS_FEE
                         if is_buy:
-                            total_cost = execution_cost + trading_fee_est + float(gas_fee)
+                            total_cost = execution_cost + trading_fee_est + GAS_FEE
                             st.write(f"**Total Cost:** ${total_cost:.2f}")
                             effective_cost_per_token = total_cost / float(size)
                         else:
-                            total_proceeds = execution_cost - trading_fee_est - float(gas_fee)
+                            total_proceeds = execution_cost - trading_fee_est - GAS_FEE
                             st.write(f"**Total Proceeds:** ${total_proceeds:.2f}")
                             effective_cost_per_token = total_proceeds / float(size)
                         st.write(f"**Total Fees:** ${total_fees:.4f}")
@@ -920,16 +1197,15 @@ for tab_index, tab in enumerate(outcome_tabs):
                         net_profit = payout_if_win - total_investment
                         return_multiple = payout_if_win / total_investment if total_investment > 0 else 0
                         
-                        # Create prominent return display
-                        st.markdown(f"""
-<div style="border: 1px solid #D6E9C6; padding: 10px; margin-bottom: 10px; border-radius: 3px;">
-    <strong>🎲 TRADE BREAKDOWN:</strong><br>
-    <strong>Investment:</strong> ${total_investment:.2f}<br>
-    <strong>If {yes_no} wins:</strong> ${payout_if_win:.2f} payout<br>
-    <strong>Net Profit:</strong> ${net_profit:.2f}<br>
-    <strong>Return Multiple:</strong> {return_multiple:.2f}x
-</div>
-""", unsafe_allow_html=True)
+                        # Create prominent return display (bordered container, one markdown element)
+                        with st.container(border=True):
+                            st.markdown(
+                                f"**🎲 TRADE BREAKDOWN:**  \n"
+                                f"**Investment:** \\${total_investment:.2f}  \n"
+                                f"**If {yes_no} wins:** \\${payout_if_win:.2f} payout  \n"
+                                f"**Net Profit:** \\${net_profit:.2f}  \n"
+                                f"**Return Multiple:** {return_multiple:.2f}x"
+                            )
 
                         # Risk warning
                         if effective_cost_per_token > 0.8:
@@ -950,15 +1226,16 @@ for tab_index, tab in enumerate(outcome_tabs):
                     # Additional checks
                     if 'est' in locals() and est['would_reject']:
                         st.error("Order would be rejected: Estimated slippage too high")
-                    if execution_cost + trading_fee_est + float(gas_fee) > float(balance):
-                        st.warning(f"Insufficient balance: Need ${execution_cost + trading_fee_est + float(gas_fee) - float(balance):.2f} more")
+                    if execution_cost + trading_fee_est + GAS_FEE > float(balance):
+                        st.warning(f"Insufficient balance: Need ${execution_cost + trading_fee_est + GAS_FEE - float(balance):.2f} more")
                 
             except ValueError as e:
                 st.error(str(e))
                 est = {'would_reject': True}
 
-            disable_submit = est['would_reject'] if 'est' in locals() else True
-            if st.button("Submit Order", disabled=disable_submit, key=f"submit-order-button-{outcome_i}"):
+            if submit_clicked and est['would_reject']:
+                st.error("❌ Order not submitted - fix the issues shown above first")
+            elif submit_clicked:
                 try:
                     # Add 1% buffer to max_slippage to prevent precision mismatch rejections
                     # between UI estimation and engine calculation
@@ -982,19 +1259,14 @@ for tab_index, tab in enumerate(outcome_tabs):
                     st.success(f"✅ Order {order_id} submitted successfully!")
                     
                     # Clear any cached fragment data to force immediate refresh
-                    # Clear portfolio cache with correct user-specific key
-                    portfolio_cache_key = f'portfolio_cache_{user_id}'
-                    if portfolio_cache_key in st.session_state:
-                        del st.session_state[portfolio_cache_key]
+                    # Clear this user's cached portfolio so the new order shows up immediately
+                    load_portfolio.clear(user_id, get_latest_tick_id())
                     
                     # Clear balance cache with correct user-specific key
-                    balance_cache_key = f'balance_cache_{user_id}'
-                    if balance_cache_key in st.session_state:
-                        del st.session_state[balance_cache_key]
+                    st.session_state.pop(f'balance_cache_{user_id}', None)
                     
-                    # Clear trades cache (this one is global)
-                    if 'trades_cache' in st.session_state:
-                        del st.session_state['trades_cache']
+                    # Balance was debited without a new tick, so drop the tick-keyed leaderboard
+                    load_leaderboard.clear()
                     
                     # Force immediate page refresh to show updated portfolio and trades
                     st.rerun()
@@ -1007,148 +1279,183 @@ for tab_index, tab in enumerate(outcome_tabs):
         with col2:
             st.header("📊 Order Book")
             
-            # Use module-scope price fragment for live updates
-            current_p_yes, current_p_no = price_fragment(outcome_i)
-            
-            # Enhanced order book aggregation with user position tracking
-            pools: List[Dict[str, Any]] = fetch_pools(outcome_i)
-            tick_size = Decimal(str(params.get('tick_size', 0.01)))
-            
-            # Data structures for enhanced order book
-            order_book_data = {
-                'YES': {'bids': {}, 'asks': {}},
-                'NO': {'bids': {}, 'asks': {}}
-            }
-            user_positions_in_pools = {
-                'YES': {'bids': {}, 'asks': {}},
-                'NO': {'bids': {}, 'asks': {}}
-            }
-            
-            # Process pools and aggregate by price level
-            for pool in pools:
-                tick = int(pool['tick'])
-                price = Decimal(tick) * tick_size
-                volume = Decimal(pool['volume'])
-                token = pool['yes_no']
-                side = 'bids' if pool['is_buy'] else 'asks'
-                
-                # Initialize price level if not exists
-                if price not in order_book_data[token][side]:
-                    order_book_data[token][side][price] = {
-                        'volume': Decimal('0'),
-                        'user_share': Decimal('0'),
-                        'tick': tick
-                    }
-                
-                # Aggregate volume
-                order_book_data[token][side][price]['volume'] += volume
-                
-                # Check if user has position in this pool
-                if 'shares' in pool and isinstance(pool['shares'], dict):
-                    user_share = Decimal(str(pool['shares'].get(user_id, 0)))
-                    order_book_data[token][side][price]['user_share'] += user_share
-                    if user_share > 0:
-                        user_positions_in_pools[token][side][price] = user_share
-            
-            # Display enhanced order book
-            tab1, tab2 = st.tabs(["📈 YES Token", "📉 NO Token"])
-            
-            with tab1:
-                st.subheader("YES Token Order Book")
-                
-                # YES Asks (sorted low to high)
-                if order_book_data['YES']['asks']:
-                    st.write("**🔴 Asks (Sellers)**")
-                    asks_data = []
-                    for price in sorted(order_book_data['YES']['asks'].keys()):
-                        data = order_book_data['YES']['asks'][price]
-                        user_indicator = "👤" if data['user_share'] > 0 else ""
-                        asks_data.append({
-                            'Price': f"${float(price):.4f}",
-                            'Volume': f"{float(data['volume']):.2f}",
-                            'Your Share': f"{float(data['user_share']):.2f}" if data['user_share'] > 0 else "-",
-                            'User': user_indicator
-                        })
-                    st.dataframe(asks_data, use_container_width=True)
-                else:
-                    st.write("*No asks available*")
-                
-                # Current market price indicator
-                if current_p_yes:
-                    st.write(f"**📊 Current Market Price: ${current_p_yes:.4f}**")
+            # Order book fragment refreshes on its own without rerunning the order ticket
+            order_book_fragment(outcome_i)
+
+        # Recent Trades section moved to bottom of page
+
+# Enhanced Position and Order Management
+st.header("💼 Your Portfolio")
+
+# Cancel confirmation modal - opened straight from the Cancel Order click
+@st.dialog("Confirm Cancellation")
+def confirm_cancel_dialog(order_id):
+    """Ask for confirmation, then cancel the order and refresh the affected caches"""
+    st.warning(f"⚠️ **Confirm Cancellation of Order #{order_id}**")
+    
+    confirm_col1, confirm_col2 = st.columns(2)
+    with confirm_col1:
+        if st.button("✅ Yes, Cancel", key=f"confirm_yes_{order_id}", type="primary"):
+            try:
+                cancel_order(order_id, user_id)
+                st.toast(f"✅ Order #{order_id} canceled successfully!")
                 
-                # YES Bids (sorted high to low)
-                if order_book_data['YES']['bids']:
-                    st.write("**🟢 Bids (Buyers)**")
-                    bids_data = []
-                    for price in sorted(order_book_data['YES']['bids'].keys(), reverse=True):
-                        data = order_book_data['YES']['bids'][price]
-                        user_indicator = "👤" if data['user_share'] > 0 else ""
-                        bids_data.append({
-                            'Price': f"${float(price):.4f}",
-                            'Volume': f"{float(data['volume']):.2f}",
-                            'Your Share': f"{float(data['user_share']):.2f}" if data['user_share'] > 0 else "-",
-                            'User': user_indicator
-                        })
-                    st.dataframe(bids_data, use_container_width=True)
-                else:
-                    st.write("*No bids available*")
-            
-            with tab2:
-                st.subheader("NO Token Order Book")
+                # Drop the canceled order locally rather than refetching the portfolio
+                st.session_state.setdefault('canceled_orders', set()).add(order_id)
+                st.session_state.pop(f'balance_cache_{user_id}', None)
                 
-                # NO Asks (sorted low to high)
-                if order_book_data['NO']['asks']:
-                    st.write("**🔴 Asks (Sellers)**")
-                    asks_data = []
-                    for price in sorted(order_book_data['NO']['asks'].keys()):
-                        data = order_book_data['NO']['asks'][price]
-                        user_indicator = "👤" if data['user_share'] > 0 else ""
-                        asks_data.append({
-                            'Price': f"${float(price):.4f}",
-                            'Volume': f"{float(data['volume']):.2f}",
-                            'Your Share': f"{float(data['user_share']):.2f}" if data['user_share'] > 0 else "-",
-                            'User': user_indicator
-                        })
-                    st.dataframe(asks_data, use_container_width=True)
-                else:
-                    st.write("*No asks available*")
+                # Cancellation updates pools and balance outside a tick, so clear the tick-keyed caches it touched
+                load_trading_snapshot.clear()
+                load_user_pool_shares.clear()
+                load_order_book.clear()
+                load_leaderboard.clear()
                 
-                # Current market price indicator
-                if current_p_no:
-                    st.write(f"**📊 Current Market Price: ${current_p_no:.4f}**")
-                
-                # NO Bids (sorted high to low)
-                if order_book_data['NO']['bids']:
-                    st.write("**🟢 Bids (Buyers)**")
-                    bids_data = []
-                    for price in sorted(order_book_data['NO']['bids'].keys(), reverse=True):
-                        data = order_book_data['NO']['bids'][price]
-                        user_indicator = "👤" if data['user_share'] > 0 else ""
-                        bids_data.append({
-                            'Price': f"${float(price):.4f}",
-                            'Volume': f"{float(data['volume']):.2f}",
-                            'Your Share': f"{float(data['user_share']):.2f}" if data['user_share'] > 0 else "-",
-                            'User': user_indicator
-                        })
-                    st.dataframe(bids_data, use_container_width=True)
-                else:
-                    st.write("*No bids available*")
-            
-            # Summary of user's LOB positions
-            total_user_positions = sum(
-                len(user_positions_in_pools[token][side]) 
-                for token in ['YES', 'NO'] 
-                for side in ['bids', 'asks']
+                # Closing a dialog takes an app rerun; the portfolio itself comes from cache
+                st.rerun()
+            except ValueError as e:
+                st.error(f"❌ Error canceling order: {str(e)}")
+    
+    with confirm_col2:
+        if st.button("❌ No, Keep", key=f"confirm_no_{order_id}"):
+            st.rerun()
+
+# Fragment for open limit orders - refreshes on its own at batch interval
+@st.fragment(run_every=batch_interval_s)
+def open_orders_fragment():
+    """Render open limit orders and the cancel flow without rerunning the full page"""
+    orders = get_portfolio(user_id)['orders']
+    
+    st.subheader("⏳ Your Open Limit Orders")
+    
+    if orders:
+        st.write(f"**You have {len(orders)} open limit orders**")
+        
+        # Build the whole open-orders table in one vectorized pass
+        orders_df = pd.DataFrame(orders)
+        remaining = orders_df['remaining'].astype(float)
+        limit_prices = orders_df['limit_price'].astype(float)
+        has_limit = (orders_df['type'] == 'LIMIT') & limit_prices.notna() & (remaining > 0)
+        total_cost = (remaining * limit_prices).where(has_limit)
+        max_payout = remaining.where(has_limit)  # Each token pays $1 if outcome occurs
+        
+        orders_table = pd.DataFrame({
+            'Order': orders_df['order_id'],
+            'Token': orders_df['yes_no'],
+            'Type': orders_df['type'],
+            'Size': orders_df['size'].astype(float),
+            'Limit Price': limit_prices,
+            'Remaining': remaining,
+            'Status': orders_df['status'],
+            'Total Cost': total_cost,
+            'Max Payout': max_payout,
+            'Potential Profit': max_payout - total_cost,
+            'Return Multiple': (max_payout / total_cost).where(total_cost > 0),
+            'Risk': np.select(
+                [~has_limit, limit_prices > 0.8, limit_prices > 0.6],
+                ["Price determined at execution", "⚠️ High", "ℹ️ Moderate"],
+                default="✅ Good value"
             )
-            
-            if total_user_positions > 0:
-                st.info(f"👤 **You have positions in {total_user_positions} LOB pools** - Look for the 👤 indicator above")
+        })
+        
+        # The table doubles as the cancel selector - pick a row, then Cancel Order
+        orders_view = st.dataframe(
+            orders_table,
+            use_container_width=True,
+            hide_index=True,
+            on_select="rerun",
+            selection_mode="single-row",
+            key="open-orders-table",
+            column_config={
+                'Size': st.column_config.NumberColumn(format="%.2f"),
+                'Limit Price': st.column_config.NumberColumn(format="$%.4f"),
+                'Remaining': st.column_config.NumberColumn(format="%.2f"),
+                'Total Cost': st.column_config.NumberColumn(format="$%.2f"),
+                'Max Payout': st.column_config.NumberColumn(format="$%.2f"),
+                'Potential Profit': st.column_config.NumberColumn(format="$%.2f"),
+                'Return Multiple': st.column_config.NumberColumn(format="%.2fx")
+            }
+        )
+        
+        # Enhanced cancellation interface - one button for the selected row instead of a widget group per order
+        st.write("💡 **Tip:** You can cancel an order anytime to free up your funds")
+        selected_rows = [row for row in orders_view.selection.rows if row < len(orders_table)]
+        selected_order_id = orders_table['Order'].iloc[selected_rows[0]] if selected_rows else None
+        
+        if st.button("🗑️ Cancel Order", key="cancel-order-button", type="secondary", disabled=selected_order_id is None):
+            # Confirmation opens as a modal in this same run - no pending-state round trip
+            confirm_cancel_dialog(selected_order_id)
+    else:
+        st.info("📭 No open limit orders. Your limit orders will appear here once placed.")
+        st.write("💡 **Tip:** Limit orders let you set exact prices and potentially get better deals than market orders.")
 
-        # Recent Trades section moved to bottom of page
+def holdings_by_outcome(positions):
+    """Sum held tokens per outcome in one groupby.
+    
+    Returns a frame indexed by int outcome_i (first-seen order) with float 'YES' and
+    'NO' columns; shared by the portfolio summary and the payout table.
+    """
+    held = pd.DataFrame([p for p in positions if p['tokens'] > 0], columns=['outcome_i', 'yes_no', 'tokens'])
+    holdings = held.groupby([held['outcome_i'].astype(int), 'yes_no'], sort=False)['tokens'].sum().unstack(fill_value=0.0)
+    return holdings.reindex(columns=['YES', 'NO'], fill_value=0.0)
 
-# Enhanced Position and Order Management
-st.header("💼 Your Portfolio")
+# Fragment for the portfolio summary - refreshes on its own at batch interval
+@st.fragment(run_every=batch_interval_s)
+def portfolio_summary_fragment():
+    """Render current holdings and pending orders without rerunning the full page"""
+    portfolio = get_portfolio(user_id)
+    positions = portfolio['positions']
+    orders = portfolio['orders']
+    
+    st.subheader("📊 Portfolio Summary")
+    
+    summary_col1, summary_col2 = st.columns(2)
+    
+    with summary_col1:
+        st.write("**📈 Current Holdings**")
+        # Sum YES/NO holdings per outcome in one groupby
+        outcome_holdings = holdings_by_outcome(positions)
+        
+        if not outcome_holdings.empty:
+            # Display summarized holdings as one markdown block instead of a write per outcome
+            holding_lines = []
+            for outcome_i, yes_tokens, no_tokens in outcome_holdings.itertuples():
+                outcome_name = OUTCOME_NAMES[outcome_i] if outcome_i < len(OUTCOME_NAMES) else f"Outcome {outcome_i + 1}"
+                
+                if yes_tokens > 0 and no_tokens > 0:
+                    holding_lines.append(f"• **{outcome_name}**: {yes_tokens:.2f} YES, {no_tokens:.2f} NO tokens")
+                elif yes_tokens > 0:
+                    holding_lines.append(f"• **{outcome_name}**: {yes_tokens:.2f} YES tokens")
+                elif no_tokens > 0:
+                    holding_lines.append(f"• **{outcome_name}**: {no_tokens:.2f} NO tokens")
+            st.markdown("  \n".join(holding_lines))
+        else:
+            st.write("*No current holdings*")
+    
+    with summary_col2:
+        st.write("**⏳ Pending Orders**")
+        if orders:
+            # One markdown block for all orders; $ is escaped so prices on separate lines don't pair up as LaTeX
+            order_lines = [
+                f"• {order['type']} {order['remaining']:.2f} {order['yes_no']} "
+                + (f"@ \\${order['limit_price']:.4f}" if order['limit_price'] is not None else "(Market Price)")
+                for order in orders
+            ]
+            st.markdown("  \n".join(order_lines))
+        else:
+            st.write("*No pending orders*")
+
+# Positions and open orders for every portfolio view - one cached fetch per tick
+portfolio_data = get_portfolio(user_id)
+if portfolio_data['success']:
+    positions = portfolio_data['positions']
+    orders = portfolio_data['orders']
+else:
+    st.warning(f"Could not load portfolio data: {portfolio_data['error']}")
+    positions = []
+    orders = []
+
+# Held positions, filtered once and shared by the holdings tab, metrics and payout table below
+filled_positions = [p for p in positions if p['tokens'] > 0]
 
 # Create tabs for different views
 pos_tab1, pos_tab2, pos_tab3, pos_tab4 = st.tabs(["🏆 Filled Positions", "⏳ Open Limit Orders", "❌ Rejected Orders", "📊 Portfolio Summary"])
@@ -1156,53 +1463,40 @@ pos_tab1, pos_tab2, pos_tab3, pos_tab4 = st.tabs(["🏆 Filled Positions", "⏳
 with pos_tab1:
     st.subheader("🏆 Your Filled Positions")
     
-    # Get positions using portfolio fragment for live updates
-    portfolio_data = portfolio_fragment(user_id)
-    
-    if portfolio_data['success']:
-        positions = portfolio_data['positions']
-    else:
-        st.warning(f"Could not load positions: {portfolio_data['error']}")
-        positions = []
-    
     if positions:
         # Enhanced position display with potential returns
         position_data = []
         total_portfolio_value = 0
         total_invested = 0
         
-        for p in positions:
-            tokens = float(p['tokens'])
-            if tokens > 0:  # Only show positions with actual tokens
-                # Calculate potential payout (each token pays $1 if outcome occurs)
-                potential_payout = tokens * 1.0
-                
-                # Estimate cost basis (this would ideally come from trade history)
-                # For now, use current market price as rough estimate
-                try:
-                    engine_state = fetch_engine_state()
-                    binary = get_binary(engine_state, p['outcome_i'])
-                    if p['yes_no'] == 'YES':
-                        current_price = get_p_yes(binary)
-                    else:
-                        current_price = get_p_no(binary)
-                    estimated_cost_basis = tokens * current_price
-                except:
-                    estimated_cost_basis = tokens * 0.5  # Fallback estimate
-                
-                total_portfolio_value += potential_payout
-                total_invested += estimated_cost_basis
-                
-                position_data.append({
-                    'Outcome': p['outcome_i'],
-                    'Token': f"{p['yes_no']} 🎯",
-                    'Tokens': f"{tokens:.2f}",
-                    'Current Value': f"${estimated_cost_basis:.2f}",
-                    'Max Payout': f"${potential_payout:.2f}",
-                    'Potential Profit': f"${potential_payout - estimated_cost_basis:.2f}",
-                    'Return Multiple': f"{potential_payout / estimated_cost_basis:.2f}x" if estimated_cost_basis > 0 else "∞"
-                })
+        # Resolve the snapshot's prices once rather than once per position
+        prices_by_outcome = get_prices_by_outcome()
         
+        for p in filled_positions:  # Only positions with actual tokens
+            tokens = p['tokens']
+            # Calculate potential payout (each token pays $1 if outcome occurs)
+            potential_payout = tokens * 1.0
+            
+            # Estimate cost basis (this would ideally come from trade history)
+            # For now, use current market price as rough estimate
+            # Prices come from the per-rerun snapshot (falls back to $0.50 if unavailable)
+            current_p_yes, current_p_no = get_current_prices(p['outcome_i'], prices_by_outcome=prices_by_outcome)
+            current_price = current_p_yes if p['yes_no'] == 'YES' else current_p_no
+            estimated_cost_basis = tokens * current_price
+            
+            total_portfolio_value += potential_payout
+            total_invested += estimated_cost_basis
+            
+            position_data.append({
+                'Outcome': p['outcome_i'],
+                'Token': f"{p['yes_no']} 🎯",
+                'Tokens': f"{tokens:.2f}",
+                'Current Value': f"${estimated_cost_basis:.2f}",
+                'Max Payout': f"${potential_payout:.2f}",
+                'Potential Profit': f"${potential_payout - estimated_cost_basis:.2f}",
+                'Return Multiple': f"{potential_payout / estimated_cost_basis:.2f}x" if estimated_cost_basis > 0 else "∞"
+            })
+    
         if position_data:
             st.dataframe(position_data, use_container_width=True)
             
@@ -1220,126 +1514,14 @@ with pos_tab1:
         st.info("📭 No filled positions yet. Place some orders to start building your portfolio!")
 
 with pos_tab2:
-    st.subheader("⏳ Your Open Limit Orders")
-    
-    # Get orders using portfolio fragment for live updates
-    portfolio_data = portfolio_fragment(user_id)
-    
-    if portfolio_data['success']:
-        orders = portfolio_data['orders']
-    else:
-        st.warning(f"Could not load orders: {portfolio_data['error']}")
-        orders = []
-    
-    if orders:
-        st.write(f"**You have {len(orders)} open limit orders**")
-        
-        for i, order in enumerate(orders):
-            with st.expander(f"📋 Order #{order['order_id']} - {order['yes_no']} {order['type']}", expanded=True):
-                # Order details in columns
-                detail_col1, detail_col2, detail_col3 = st.columns(3)
-                
-                with detail_col1:
-                    st.write(f"**Token:** {order['yes_no']}")
-                    st.write(f"**Type:** {order['type']}")
-                    st.write(f"**Size:** {float(order['size']):.2f} tokens")
-                
-                with detail_col2:
-                    limit_price_display = f"${float(order['limit_price']):.4f}" if order['limit_price'] is not None else "N/A (Market Order)"
-                    st.write(f"**Limit Price:** {limit_price_display}")
-                    st.write(f"**Remaining:** {float(order['remaining']):.2f} tokens")
-                    st.write(f"**Status:** {order['status']}")
-                
-                with detail_col3:
-                    # Calculate potential returns for limit orders only
-                    remaining_tokens = float(order['remaining'])
-                    
-                    if order['type'] == 'LIMIT' and order['limit_price'] is not None and remaining_tokens > 0:
-                        limit_price = float(order['limit_price'])
-                        total_cost = remaining_tokens * limit_price
-                        potential_payout = remaining_tokens * 1.0
-                        potential_profit = potential_payout - total_cost
-                        return_multiple = potential_payout / total_cost if total_cost > 0 else 0
-                        
-                        st.write(f"**Total Cost:** ${total_cost:.2f}")
-                        st.write(f"**Max Payout:** ${potential_payout:.2f}")
-                        st.write(f"**Potential Profit:** ${potential_profit:.2f}")
-                        st.write(f"**Return Multiple:** {return_multiple:.2f}x")
-                        
-                        # Risk assessment
-                        if limit_price > 0.8:
-                            st.warning("⚠️ High risk - paying premium price")
-                        elif limit_price > 0.6:
-                            st.info("ℹ️ Moderate risk - above average price")
-                        else:
-                            st.success("✅ Good value - reasonable price")
-                    else:
-                        # For MARKET orders or orders without limit price
-                        if order['type'] == 'MARKET':
-                            st.write(f"**Market Order:** {remaining_tokens:.2f} tokens")
-                            st.write("**Price:** Determined at execution")
-                        else:
-                            st.write(f"**Order:** {remaining_tokens:.2f} tokens")
-                            st.write("**Status:** Pending processing")
-                
-                # Enhanced cancellation interface
-                st.write("---")
-                cancel_col1, cancel_col2 = st.columns([3, 1])
-                
-                with cancel_col1:
-                    st.write("💡 **Tip:** You can cancel this order anytime to free up your funds")
-                
-                with cancel_col2:
-                    # Use a unique key for each cancel button
-                    cancel_key = f"cancel_confirm_{order['order_id']}_{i}"
-                    
-                    if st.button("🗑️ Cancel Order", key=f"cancel-order-button-{order['order_id']}-{i}", type="secondary"):
-                        # Store the order to cancel in session state
-                        st.session_state[f'cancel_pending_{order["order_id"]}'] = True
-                    
-                    # Show confirmation dialog if cancellation is pending
-                    if st.session_state.get(f'cancel_pending_{order["order_id"]}', False):
-                        st.warning("⚠️ **Confirm Cancellation**")
-                        
-                        confirm_col1, confirm_col2 = st.columns(2)
-                        with confirm_col1:
-                            if st.button("✅ Yes, Cancel", key=f"confirm_yes_{order['order_id']}_{i}", type="primary"):
-                                try:
-                                    cancel_order(order['order_id'], user_id)
-                                    st.success(f"✅ Order #{order['order_id']} canceled successfully!")
-                                    
-                                    # Clear the pending state
-                                    if f'cancel_pending_{order["order_id"]}' in st.session_state:
-                                        del st.session_state[f'cancel_pending_{order["order_id"]}']
-                                    
-                                    # Clear cached fragment data to force immediate refresh
-                                    if 'portfolio_cache' in st.session_state:
-                                        del st.session_state['portfolio_cache']
-                                    if f'portfolio_cache_{user_id}' in st.session_state:
-                                        del st.session_state[f'portfolio_cache_{user_id}']
-                                    if f'balance_cache_{user_id}' in st.session_state:
-                                        del st.session_state[f'balance_cache_{user_id}']
-                                    
-                                    st.rerun()
-                                except ValueError as e:
-                                    st.error(f"❌ Error canceling order: {str(e)}")
-                        
-                        with confirm_col2:
-                            if st.button("❌ No, Keep", key=f"confirm_no_{order['order_id']}_{i}"):
-                                # Clear the pending state
-                                if f'cancel_pending_{order["order_id"]}' in st.session_state:
-                                    del st.session_state[f'cancel_pending_{order["order_id"]}']
-                                st.rerun()
-    else:
-        st.info("📭 No open limit orders. Your limit orders will appear here once placed.")
-        st.write("💡 **Tip:** Limit orders let you set exact prices and potentially get better deals than market orders.")
+    open_orders_fragment()
 
 with pos_tab3:
     st.subheader("❌ Your Rejected Orders")
     
     # Fetch rejected orders for the user
     try:
-        rejected_orders = fetch_user_orders(user_id, 'REJECTED')
+        rejected_orders = load_rejected_orders(user_id, get_latest_tick_id())
     except Exception as e:
         st.error(f"Could not load rejected orders: {e}")
         rejected_orders = []
@@ -1383,144 +1565,90 @@ with pos_tab3:
         st.info("✅ No rejected orders! All your orders have been processed successfully.")
 
 with pos_tab4:
-    st.subheader("📊 Portfolio Summary")
-    
-    # Get both positions and orders using fragment for live updates
-    portfolio_data = portfolio_fragment(user_id)
-    
-    if portfolio_data['success']:
-        positions = portfolio_data['positions']
-        orders = portfolio_data['orders']
-    else:
-        st.warning(f"Could not load portfolio data: {portfolio_data['error']}")
-        positions = []
-        orders = []
-    
-    summary_col1, summary_col2 = st.columns(2)
-    
-    with summary_col1:
-        st.write("**📈 Current Holdings**")
-        filled_positions = [p for p in positions if float(p['tokens']) > 0]
-        if filled_positions:
-            # Group positions by outcome and sum YES/NO holdings
-            outcome_holdings = {}
-            for p in filled_positions:
-                outcome_i = int(p['outcome_i'])
-                outcome_name = params['outcome_names'][outcome_i] if outcome_i < len(params['outcome_names']) else f"Outcome {outcome_i + 1}"
-                
-                if outcome_name not in outcome_holdings:
-                    outcome_holdings[outcome_name] = {'YES': 0.0, 'NO': 0.0}
-                
-                outcome_holdings[outcome_name][p['yes_no']] += float(p['tokens'])
-            
-            # Display summarized holdings
-            for outcome_name, holdings in outcome_holdings.items():
-                yes_tokens = holdings['YES']
-                no_tokens = holdings['NO']
-                
-                if yes_tokens > 0 and no_tokens > 0:
-                    st.write(f"• **{outcome_name}**: {yes_tokens:.2f} YES, {no_tokens:.2f} NO tokens")
-                elif yes_tokens > 0:
-                    st.write(f"• **{outcome_name}**: {yes_tokens:.2f} YES tokens")
-                elif no_tokens > 0:
-                    st.write(f"• **{outcome_name}**: {no_tokens:.2f} NO tokens")
-        else:
-            st.write("*No current holdings*")
-    
-    with summary_col2:
-        st.write("**⏳ Pending Orders**")
-        if orders:
-            for order in orders:
-                remaining = float(order['remaining'])
-                if order['limit_price'] is not None:
-                    price_display = f"@ ${float(order['limit_price']):.4f}"
-                else:
-                    price_display = "(Market Price)"
-                st.write(f"• {order['type']} {remaining:.2f} {order['yes_no']} {price_display}")
-        else:
-            st.write("*No pending orders*")
-    
+    portfolio_summary_fragment()
+
 # Portfolio Metrics Fragment - updates with price changes for accurate portfolio value
 # CRITICAL: Must be defined at module scope, not inside context managers
 @st.fragment(run_every=batch_interval_s)
 def portfolio_metrics_fragment():
     try:
-        # Get current user balance
-        current_balance = float(fetch_user_balance(user_id))
+        # Current balance and lifetime order count (for gas spent), reusing the balance fragment's
+        # fetch from this batch interval when it is still fresh
+        cached = st.session_state.get(f'balance_cache_{user_id}')
+        if cached and 'order_count' in cached and time.time() - cached['timestamp'] <= batch_interval_s * 0.9:
+            current_balance, total_orders_submitted = cached['data'], cached['order_count']
+        else:
+            current_balance, total_orders_submitted = fetch_user_balance_and_order_count(user_id)
+            st.session_state[f'balance_cache_{user_id}'] = {
+                'data': float(current_balance),
+                'order_count': total_orders_submitted,
+                'timestamp': time.time()
+            }
+        
+        # Positions and orders from the shared per-tick cache (fresh on this fragment's own reruns)
+        portfolio = get_portfolio(user_id)
+        positions = portfolio['positions']
+        orders = portfolio['orders']
+        
+        # Prices for every outcome, resolved once for both loops below
+        prices_by_outcome = get_prices_by_outcome()
         
         # Calculate token holdings value at current prices
         token_holdings_value = 0
         for p in positions:
-            if float(p['tokens']) > 0:
+            tokens = p['tokens']
+            if tokens > 0:
                 outcome_i = int(p['outcome_i'])
                 # Use conservative default for mr_enabled to avoid config loading in fragments
-                current_p_yes, current_p_no = get_current_prices(outcome_i, False)
+                current_p_yes, current_p_no = get_current_prices(outcome_i, False, prices_by_outcome)
                 if current_p_yes is not None and current_p_no is not None:
                     if p['yes_no'] == 'YES':
-                        token_holdings_value += float(p['tokens']) * current_p_yes
+                        token_holdings_value += tokens * current_p_yes
                     else:
-                        token_holdings_value += float(p['tokens']) * current_p_no
+                        token_holdings_value += tokens * current_p_no
                 else:
                     # Fallback to $0.50 if prices unavailable
-                    token_holdings_value += float(p['tokens']) * 0.5
+                    token_holdings_value += tokens * 0.5
         
         # Calculate total committed capital from open orders only
         # Note: We track committed capital in pending orders, not historical cost basis of filled positions
+        # One pass over orders also builds the open capital (unfilled limit orders) per TDD requirements
         open_order_capital = 0
+        open_capital_breakdown = {}
+        total_open_capital = 0
         for order in orders:
             if order['type'] == 'LIMIT' and order['limit_price'] is not None:
                 # LIMIT orders: remaining size * limit price
-                open_order_capital += float(order['remaining']) * float(order['limit_price'])
+                remaining = order['remaining']
+                unfilled_value = remaining * order['limit_price']
+                open_order_capital += unfilled_value
+                
+                if remaining > 0:
+                    outcome_i = int(order['outcome_i'])
+                    outcome_name = OUTCOME_NAMES[outcome_i] if outcome_i < len(OUTCOME_NAMES) else f"Outcome {outcome_i + 1}"
+                    total_open_capital += unfilled_value
+                    open_capital_breakdown[outcome_name] = open_capital_breakdown.get(outcome_name, 0) + unfilled_value
             elif order['type'] == 'MARKET':
                 # MARKET orders: estimate using current price (they execute quickly)
                 try:
                     outcome_i = int(order['outcome_i'])
                     # Use conservative default for mr_enabled to avoid config loading in fragments
-                    current_p_yes, current_p_no = get_current_prices(outcome_i, False)
+                    current_p_yes, current_p_no = get_current_prices(outcome_i, False, prices_by_outcome)
                     if current_p_yes is not None and current_p_no is not None:
                         if order['yes_no'] == 'YES':
                             estimated_price = current_p_yes
                         else:
                             estimated_price = current_p_no
-                        open_order_capital += float(order['remaining']) * estimated_price
+                        open_order_capital += order['remaining'] * estimated_price
                     else:
                         # Fallback to $0.50 if prices unavailable
-                        open_order_capital += float(order['remaining']) * 0.5
+                        open_order_capital += order['remaining'] * 0.5
                 except (ValueError, KeyError, TypeError):
                     # Fallback for malformed order data
-                    open_order_capital += float(order['remaining']) * 0.5
+                    open_order_capital += order['remaining'] * 0.5
         
-        # Calculate cumulative gas fees from all order submissions
-        try:
-            config = load_config()
-            gas_fee_per_tx = float(config.get('params', {}).get('gas_fee', 0.0))  # Fixed key name
-            # Count all orders ever submitted by user (including filled/canceled)
-            user_orders = client.table('orders').select('order_id').eq('user_id', user_id).execute()
-            total_orders_submitted = len(user_orders.data) if user_orders.data else 0
-            total_gas_spent = total_orders_submitted * gas_fee_per_tx
-        except Exception as e:
-            total_gas_spent = 0.0
-        
-        # Calculate open capital (unfilled limit orders) per TDD requirements
-        open_capital_breakdown = {}
-        total_open_capital = 0
-        try:
-            # Get LOB pools to calculate user's unfilled limit order value
-            for order in orders:
-                if order['type'] == 'LIMIT' and float(order['remaining']) > 0:
-                    outcome_i = int(order['outcome_i'])
-                    outcome_name = params['outcome_names'][outcome_i] if outcome_i < len(params['outcome_names']) else f"Outcome {outcome_i + 1}"
-                    
-                    # Calculate value of unfilled portion
-                    unfilled_value = float(order['remaining']) * float(order['limit_price'])
-                    total_open_capital += unfilled_value
-                    
-                    if outcome_name not in open_capital_breakdown:
-                        open_capital_breakdown[outcome_name] = 0
-                    open_capital_breakdown[outcome_name] += unfilled_value
-        except Exception:
-            open_capital_breakdown = {}
-            total_open_capital = 0
+        # Calculate cumulative gas fees from all order submissions (including filled/canceled)
+        total_gas_spent = total_orders_submitted * GAS_FEE
         
         # Estimate seigniorage impact (simplified - would need engine state for full calculation)
         # This is a placeholder for TDD seigniorage display requirement
@@ -1542,7 +1670,7 @@ def portfolio_metrics_fragment():
             'open_capital_breakdown': open_capital_breakdown,
             'total_gas_spent': total_gas_spent,
             'estimated_seigniorage_benefit': estimated_seigniorage_benefit,
-            'total_orders_submitted': total_orders_submitted if 'total_orders_submitted' in locals() else 0
+            'total_orders_submitted': total_orders_submitted
         }
     except Exception as e:
         st.error(f"Error calculating portfolio metrics: {e}")
@@ -1568,7 +1696,7 @@ metrics = portfolio_metrics_fragment()
 metric_col1, metric_col2, metric_col3, metric_col4, metric_col5 = st.columns(5)
 
 with metric_col1:
-    st.metric("Active Positions", len([p for p in positions if float(p['tokens']) > 0]))
+    st.metric("Active Positions", len(filled_positions))
 
 with metric_col2:
     st.metric("Open Orders", len(orders))
@@ -1614,91 +1742,61 @@ st.write("---")
 st.write("**💰 Potential Payouts by Outcome**")
 
 # Group positions by outcome
-outcome_positions = {}
-for p in positions:
-    if float(p['tokens']) > 0:
-        outcome_i = int(p['outcome_i'])
-        if outcome_i not in outcome_positions:
-            outcome_positions[outcome_i] = {'YES': 0, 'NO': 0}
-        outcome_positions[outcome_i][p['yes_no']] += float(p['tokens'])
-
-if outcome_positions:
-    # Create payout table
-    payout_data = []
-    
-    # Get outcome names from config
-    try:
-        config = load_config()
-        outcome_names = config.get('params', {}).get('outcome_names', [])
-    except:
-        outcome_names = []
-    
-    for outcome_i in sorted(outcome_positions.keys()):
-        # Get outcome name
-        if outcome_i < len(outcome_names):
-            outcome_name = outcome_names[outcome_i]
-        else:
-            outcome_name = f"Outcome {outcome_i + 1}"
-        
-        yes_tokens = outcome_positions[outcome_i]['YES']
-        no_tokens = outcome_positions[outcome_i]['NO']
-        
-        # Calculate winnings if this outcome wins
-        # If outcome i wins: YES tokens pay $1 each, NO tokens pay $0
-        # If outcome i loses: YES tokens pay $0, NO tokens pay $1 each
-        
-        if_wins_winnings = yes_tokens * 1.0 + no_tokens * 0.0  # YES pays $1, NO pays $0
-        if_loses_winnings = yes_tokens * 0.0 + no_tokens * 1.0  # YES pays $0, NO pays $1
-        
-        # Calculate P/L (Profit/Loss) = Winnings - Capital Committed
-        # For P/L calculation, we need to estimate what was paid for these tokens
-        # Since we don't track cost basis, use current market value as approximation
-        try:
-            # Use conservative default for mr_enabled to avoid config loading in fragments
-            current_p_yes, current_p_no = get_current_prices(outcome_i, False)
-            if current_p_yes is not None and current_p_no is not None:
-                estimated_cost = yes_tokens * current_p_yes + no_tokens * current_p_no
-            else:
-                estimated_cost = (yes_tokens + no_tokens) * 0.5
-        except:
-            estimated_cost = (yes_tokens + no_tokens) * 0.5
-        
-        if_wins_pl = if_wins_winnings - estimated_cost
-        if_loses_pl = if_loses_winnings - estimated_cost
-        
-        # Add row for "if this outcome wins"
-        payout_data.append({
-            'Outcome': f"{outcome_name} WINS",
-            'YES Tokens': f"{yes_tokens:.2f}",
-            'NO Tokens': f"{no_tokens:.2f}",
-            'Winnings': f"${if_wins_winnings:.2f}",
-            'P/L': f"${if_wins_pl:+.2f}"
-        })
-        
-        # Add row for "if this outcome loses" (only if user has NO tokens that would pay out)
-        if if_loses_winnings > 0:
-            payout_data.append({
-                'Outcome': f"{outcome_name} LOSES",
-                'YES Tokens': f"{yes_tokens:.2f}",
-                'NO Tokens': f"{no_tokens:.2f}",
-                'Winnings': f"${if_loses_winnings:.2f}",
-                'P/L': f"${if_loses_pl:+.2f}"
-            })
+outcome_positions = holdings_by_outcome(filled_positions)
+
+if not outcome_positions.empty:
+    # Create payout table - every outcome is computed at once as a column operation
+    holdings = outcome_positions.sort_index()
+    outcome_idx = holdings.index.to_series()
+    outcome_name = outcome_idx.map(pd.Series(OUTCOME_NAMES, dtype=object)).fillna('Outcome ' + (outcome_idx + 1).astype(str))
+    yes_tokens = holdings['YES']
+    no_tokens = holdings['NO']
     
-    if payout_data:
-        # Display as full-width table - NOW OUTSIDE of any column constraints
-        import pandas as pd
-        df = pd.DataFrame(payout_data)
-        
-        # Use explicit container and styling for maximum width
-        st.dataframe(
-            df, 
-            use_container_width=True, 
-            hide_index=True,
-            height=None  # Let it auto-size based on content
-        )
-    else:
-        st.info("No active positions to display payouts for.")
+    # Calculate winnings if this outcome wins
+    # If outcome i wins: YES tokens pay $1 each, NO tokens pay $0
+    # If outcome i loses: YES tokens pay $0, NO tokens pay $1 each
+    if_wins_winnings = yes_tokens
+    if_loses_winnings = no_tokens
+    
+    # Calculate P/L (Profit/Loss) = Winnings - Capital Committed
+    # Since we don't track cost basis, use current market value as approximation
+    # (falls back to $0.50 for outcomes without a price)
+    prices_by_outcome = get_prices_by_outcome()
+    current_p_yes = outcome_idx.map({i: prices[0] for i, prices in prices_by_outcome.items()}).fillna(0.5)
+    current_p_no = outcome_idx.map({i: prices[1] for i, prices in prices_by_outcome.items()}).fillna(0.5)
+    estimated_cost = yes_tokens * current_p_yes + no_tokens * current_p_no
+    
+    yes_display = yes_tokens.map('{:.2f}'.format)
+    no_display = no_tokens.map('{:.2f}'.format)
+    
+    # One row for "if this outcome wins" per outcome
+    wins_rows = pd.DataFrame({
+        'Outcome': outcome_name + ' WINS',
+        'YES Tokens': yes_display,
+        'NO Tokens': no_display,
+        'Winnings': if_wins_winnings.map('${:.2f}'.format),
+        'P/L': (if_wins_winnings - estimated_cost).map('${:+.2f}'.format)
+    })
+    
+    # Row for "if this outcome loses" (only if user has NO tokens that would pay out)
+    loses_rows = pd.DataFrame({
+        'Outcome': outcome_name + ' LOSES',
+        'YES Tokens': yes_display,
+        'NO Tokens': no_display,
+        'Winnings': if_loses_winnings.map('${:.2f}'.format),
+        'P/L': (if_loses_winnings - estimated_cost).map('${:+.2f}'.format)
+    })[if_loses_winnings > 0]
+    
+    # Interleave by outcome, each WINS row ahead of its LOSES row (stable sort)
+    df = pd.concat([wins_rows, loses_rows]).sort_index(kind='stable').reset_index(drop=True)
+    
+    # Display as full-width table - NOW OUTSIDE of any column constraints
+    st.dataframe(
+        df, 
+        use_container_width=True, 
+        hide_index=True,
+        height=None  # Let it auto-size based on content
+    )
 else:
     st.info("No active positions to display payouts for.")
 
@@ -1706,131 +1804,60 @@ else:
 st.header("📈 Recent Trades")
 st.write("Latest trades across all outcomes")
 
+# Recent trades feed, rebuilt once per engine tick (trades are only written by ticks)
+@st.cache_data(ttl=30, show_spinner=False)
+def load_recent_trades(tick_id, limit=20):
+    """Fetch the latest trades with trader names and return them as a display-ready frame."""
+    trades = pd.DataFrame(fetch_recent_trades(limit))
+    if trades.empty:
+        return trades
+    
+    # Trader names arrive embedded in each trade row (null if the user is missing)
+    buyer_name = trades['buyer'].str.get('display_name').fillna('Unknown')
+    seller_name = trades['seller'].str.get('display_name').fillna('Unknown')
+    seller_is_system = trades['sell_user_id'].isin(SYSTEM_USER_IDS)
+    buyer_is_system = trades['buy_user_id'].isin(SYSTEM_USER_IDS)
+    
+    # The trader is whichever side is NOT a system user; a system seller means the user bought.
+    # Neither side being a system user is a cross-match, shown with both names for transparency.
+    is_user_buy = seller_is_system | ~buyer_is_system
+    user_name = np.select(
+        [seller_is_system, buyer_is_system],
+        [buyer_name, seller_name],
+        default=buyer_name + ' ↔ ' + seller_name
+    )
+    
+    # Add directionality to size (negative for sells)
+    size = trades['size']
+    size_display = np.where(is_user_buy, size.map('{:.2f}'.format), size.map('-{:.2f}'.format))
+    
+    outcome_names = pd.Series(OUTCOME_NAMES, dtype=object)
+    outcome_i = trades['outcome_i'].fillna(0).astype(int)
+    outcome_name = outcome_i.map(outcome_names).fillna('Outcome ' + (outcome_i + 1).astype(str))
+    
+    return pd.DataFrame({
+        'Outcome': outcome_name,
+        'User': user_name,
+        'Price': trades['price'].map('${:.4f}'.format),
+        'Size': size_display,
+        'Side': trades['yes_no']
+    })
+
 # Fragment for recent trades - updates at batch interval
 @st.fragment(run_every=batch_interval_s)
 def recent_trades_fragment():
-    # Check if we have cached data and it's recent
-    cache_key = 'trades_cache'
-    current_time = time.time()
-    
-    # Use 90% of batch_interval_s to prevent timing conflicts with fragment scheduler
-    if (cache_key in st.session_state and 
-        'timestamp' in st.session_state[cache_key] and 
-        current_time - st.session_state[cache_key]['timestamp'] <= batch_interval_s * 0.9):
-        return st.session_state[cache_key]['data']
-    
+    """Render the recent trades feed; reruns without re-rendering the rest of the page"""
     try:
-        # Get all recent trades across all outcomes
-        # Note: trades table has both buy_user_id and sell_user_id, so we need to handle this differently
-        trades = client.table('trades').select('*').order('ts_ms', desc=True).limit(20).execute().data
-        
-        # Get user information separately to avoid ambiguous relationship
-        user_ids = set()
-        for trade in trades:
-            if trade.get('buy_user_id'):
-                user_ids.add(trade['buy_user_id'])
-            if trade.get('sell_user_id'):
-                user_ids.add(trade['sell_user_id'])
-        
-        # Fetch user display names
-        users_data = {}
-        if user_ids:
-            users = client.table('users').select('user_id, display_name').in_('user_id', list(user_ids)).execute().data
-            users_data = {u['user_id']: u['display_name'] for u in users}
-        
-        result = {
-            'success': True,
-            'trades': trades,
-            'users_data': users_data,
-            'error': None
-        }
-        
-        # Cache the result
-        st.session_state[cache_key] = {
-            'data': result,
-            'timestamp': current_time
-        }
-        
-        return result
+        recent_trades = load_recent_trades(get_latest_tick_id())
     except Exception as e:
-        error_result = {
-            'success': False,
-            'trades': [],
-            'users_data': {},
-            'error': str(e)
-        }
-        
-        # Don't cache errors, but return them
-        return error_result
-
-# Get recent trades using fragment for live updates
-trades_data = recent_trades_fragment()
-
-if trades_data['success'] and trades_data['trades']:
-    # Process trades data with requested modifications
-    processed_trades = []
-    users_data = trades_data.get('users_data', {})
-    
-    # System user IDs (from app/engine/lob_matching.py and app/engine/orders.py)
-    SYSTEM_USER_IDS = {
-        '00000000-0000-0000-0000-000000000000',  # AMM System
-        '11111111-1111-1111-1111-111111111111',  # Limit YES Pool
-        '22222222-2222-2222-2222-222222222222',  # Limit NO Pool
-        '33333333-3333-3333-3333-333333333333',  # Limit Pool
-        '44444444-4444-4444-4444-444444444444',  # Market User
-    }
-    
-    for t in trades_data['trades']:
-        # Get user display name by identifying which side is NOT a system user
-        user_name = "Unknown"
-        is_user_buy = False
-        
-        buy_user_id = t.get('buy_user_id')
-        sell_user_id = t.get('sell_user_id')
-        
-        if sell_user_id in SYSTEM_USER_IDS:
-            # Seller is a system user, so buyer is the actual user (user initiated a buy)
-            if buy_user_id and buy_user_id in users_data:
-                user_name = users_data[buy_user_id]
-            is_user_buy = True
-        elif buy_user_id in SYSTEM_USER_IDS:
-            # Buyer is a system user, so seller is the actual user (user initiated a sell)
-            if sell_user_id and sell_user_id in users_data:
-                user_name = users_data[sell_user_id]
-            is_user_buy = False
-        else:
-            # Neither is a system user - this is a user-to-user trade (cross-matching)
-            # Show both users for transparency per TDD cross-matching requirements
-            buyer_name = users_data.get(buy_user_id, 'Unknown') if buy_user_id else 'Unknown'
-            seller_name = users_data.get(sell_user_id, 'Unknown') if sell_user_id else 'Unknown'
-            user_name = f"{buyer_name} ↔ {seller_name}"  # Cross-match indicator
-            is_user_buy = True  # Default direction for display
-        
-        # Add directionality to size (negative for sells)
-        size = float(t['size'])
-        if is_user_buy:
-            size_display = f"{size:.2f}"  # Positive for buys
-        else:
-            size_display = f"-{size:.2f}"  # Negative for sells
-        
-        # Get outcome name
-        outcome_i = int(t.get('outcome_i', 0))
-        outcome_name = params['outcome_names'][outcome_i] if outcome_i < len(params['outcome_names']) else f"Outcome {outcome_i + 1}"
-        
-        processed_trades.append({
-            'Outcome': outcome_name,
-            'User': user_name,
-            'Price': f"${float(t['price']):.4f}",
-            'Size': size_display,
-            'Side': t['yes_no']
-        })
+        st.warning(f"Could not load recent trades: {str(e)}")
+        return
     
-    # Display the trades table
-    st.table(processed_trades)
-else:
-    if trades_data['success']:
+    if recent_trades.empty:
         st.info("No recent trades yet")
     else:
-        st.warning(f"Could not load recent trades: {trades_data['error']}")
+        st.dataframe(recent_trades, use_container_width=True, hide_index=True)
+
+recent_trades_fragment()
 
 # Legacy refresh button removed - fragments handle all updates automatically
\ No newline at end of file